@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+
+# Configuration
+CODE_CIVIL_PATH = "./documents/code-civil.txt"
+
+# Un article commence par une ligne "Article <numéro>" (ex: "Article 6-1", "Article L. 411-1")
+ARTICLE_HEADING_PATTERN = re.compile(r"^\s*Article\s+((?:[A-Z]\.?\s*)?\d+(?:-\d+)*)\s*$", re.IGNORECASE)
+
+# Les titres de structure (ex: "Livre Ier : Des personnes") terminent également l'article en cours.
+# Forme stricte (majuscule, ":" sur la ligne) : une ligne de texte commençant par "livre IV du code
+# pénal ;" ou "titre ..." fait partie de l'article
+STRUCTURE_HEADING_PATTERN = re.compile(r"^\s*(Livre|Titre|Chapitre|Section|Sous-section)\s[^\n]*:")
+
+# Fin attendue d'articles dont le texte contient des lignes commençant par "livre" ou "titre"
+KNOWN_ARTICLE_ENDINGS = {
+    "25": "préjudiciables aux intérêts de la France.",
+    "373-2-2": "ainsi que les modalités de leur transmission.",
+}
+
+
+def normalize_article_number(article_number: str) -> str:
+    """
+    Normalise un numéro d'article pour servir de clé d'index.
+    Ex: "Article 6-1" -> "6-1", "l. 411-1" -> "L411-1", "art. 1240" -> "1240"
+    """
+    number = article_number.strip()
+    number = re.sub(r"^(article|art)\.?\s*", "", number, flags=re.IGNORECASE)
+    number = number.replace("–", "-").replace("‑", "-")
+    number = re.sub(r"[\s.]+", "", number)
+    return number.upper()
+
+
+class ArticleStore:
+    """Index en mémoire des articles d'un code, rechargé si le fichier source change"""
+
+    def __init__(self, file_path: str = CODE_CIVIL_PATH):
+        self._file_path = file_path
+        self._articles: Dict[str, str] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._reload_if_changed()
+
+    def _parse(self, content: str) -> Dict[str, str]:
+        """
+        Découpe le texte en articles en un seul passage ligne par ligne.
+
+        :param content: Contenu complet du fichier
+        :return: Dictionnaire {numéro normalisé: texte de l'article}
+        """
+        articles = {}
+        current_number = None
+        current_lines: List[str] = []
+
+        def save_current_article():
+            if current_number is not None:
+                article_text = "\n".join(current_lines).strip()
+                articles[normalize_article_number(current_number)] = re.sub(r"\n{3,}", "\n\n", article_text)
+
+        for line in content.splitlines():
+            heading = ARTICLE_HEADING_PATTERN.match(line)
+            if heading:
+                save_current_article()
+                current_number = heading.group(1)
+                current_lines = [f"Article {current_number}"]
+            elif STRUCTURE_HEADING_PATTERN.match(line):
+                save_current_article()
+                current_number = None
+                current_lines = []
+            elif current_number is not None:
+                current_lines.append(line.strip())
+
+        save_current_article()
+        return articles
+
+    def _reload_if_changed(self):
+        """Recharge l'index si la date de modification du fichier a changé"""
+        try:
+            mtime = os.path.getmtime(self._file_path)
+        except OSError:
+            mtime = None
+
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+
+            if mtime is None:
+                self._articles = {}
+            else:
+                with open(self._file_path, 'r', encoding='utf-8') as file:
+                    self._articles = self._parse(file.read())
+                print(f"📚 {len(self._articles)} articles indexés depuis {self._file_path}")
+            self._mtime = mtime
+
+    def exists(self) -> bool:
+        """Indique si le fichier source est disponible"""
+        self._reload_if_changed()
+        return self._mtime is not None
+
+    def get_article(self, article_number: str) -> Optional[str]:
+        """
+        Retourne le texte d'un article ou None s'il n'existe pas.
+
+        :param article_number: Numéro de l'article (ex: "1240", "6-1", "L. 411-1")
+        :return: Texte complet de l'article
+        """
+        self._reload_if_changed()
+        return self._articles.get(normalize_article_number(article_number))
+
+    def get_articles(self, article_numbers: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Retourne plusieurs articles en une seule opération.
+
+        :param article_numbers: Numéros des articles à récupérer
+        :return: Dictionnaire {numéro demandé: texte de l'article ou None}
+        """
+        self._reload_if_changed()
+        articles = self._articles
+        return {number: articles.get(normalize_article_number(number)) for number in article_numbers}
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+
+def check_known_articles(store: ArticleStore) -> List[str]:
+    """
+    Vérifie que les articles de KNOWN_ARTICLE_ENDINGS sont complets (non tronqués par une ligne
+    de texte prise pour un titre de structure).
+
+    :return: Numéros des articles absents ou incomplets
+    """
+    failed = []
+    for number, ending in KNOWN_ARTICLE_ENDINGS.items():
+        article = store.get_article(number)
+        if article is None or not article.rstrip().endswith(ending):
+            failed.append(number)
+    return failed
+
+
+if __name__ == "__main__":
+    failed = check_known_articles(ArticleStore())
+    if failed:
+        raise SystemExit(f"❌ Articles incomplets: {', '.join(failed)}")
+    print(f"✅ {len(KNOWN_ARTICLE_ENDINGS)} articles vérifiés")
@@ -1,70 +1,347 @@
 import os
-from typing import Optional
+import re
+import time
+import atexit
+import asyncio
+import unicodedata
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Union
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_qdrant import QdrantVectorStore, FastEmbedSparse, RetrievalMode
-from langchain_huggingface import HuggingFaceEmbeddings
+from qdrant_client import models
+from EmbeddingBackend import get_embedding_backend
+from EmbeddingBatcher import BatchingEmbeddings, EMBEDDING_BATCHING
+from EmbeddingCache import CachedEmbeddings, CachedSparseEmbeddings, QueryCache, EMBEDDING_CACHE_PATH
+from query_filters import ensure_payload_indexes
+from collection_config import build_search_params
+from qdrant_backend import get_qdrant_client, get_async_qdrant_client, close_clients, describe_backend, QDRANT_PATH
 
 # Configuration
 COLLECTION_NAME = "code-civil-2"
+# Collections interrogées (ex: "code-civil-2,code-penal-2"), la première est la collection par défaut
+COLLECTION_NAMES = [name.strip() for name in os.getenv("QDRANT_COLLECTIONS", COLLECTION_NAME).split(",") if name.strip()]
+SEARCH_FANOUT_WORKERS = int(os.getenv("SEARCH_FANOUT_WORKERS", "8"))  # Recherches simultanées sur les collections
+CONNECT_ATTEMPTS = 3
+CONNECT_RETRY_DELAY = 2  # Secondes entre deux tentatives (serveur en cours de démarrage)
+
+
+def _collection_keywords(collection_name: str) -> str:
+    """Nom d'un code tel qu'il apparaît dans une question (ex: "code-penal-2" -> "code penal")"""
+    return re.sub(r"-\d+$", "", collection_name).replace("-", " ")
+
+
+def _normalize_text(text: str) -> str:
+    """Minuscules sans accents ni ponctuation, pour comparer une question aux noms des codes"""
+    text = unicodedata.normalize("NFD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r"[^a-z0-9]+", " ", text)
 
 class DatabaseManager:
     """Gestionnaire de connexion à la base de données Qdrant"""
     
-    def __init__(self, embedding_model: str):
-        self._collection_name = COLLECTION_NAME
+    def __init__(
+        self,
+        embedding_model: Union[str, Embeddings],
+        collection_names: Optional[List[str]] = None,
+        lazy: bool = False
+    ):
+        """
+        :param embedding_model: Nom du modèle d'embedding ou modèle déjà chargé
+        :param collection_names: Collections interrogées (la première est la collection par défaut)
+        :param lazy: Si vrai, rien n'est chargé : les étapes de load() sont lancées par l'appelant
+            (en parallèle au démarrage de l'API)
+        """
+        self._collection_names = list(collection_names or COLLECTION_NAMES)
+        self._collection_name = self._collection_names[0]
         self._embeddings = embedding_model
         self._sparse_embeddings = None
+        self._batcher: Optional[BatchingEmbeddings] = None
+        self._client = None
+        self._async_client = None
+        self._vectorstores: Dict[str, QdrantVectorStore] = {}
         self._vectorstore = None
-        self._initialize_embeddings()
-        if not self._connect():
-            raise Exception("❌ Impossible d'établir la connexion à la base de données")
-        print("✅ Base de données Qdrant connectée avec succès")
+        self._search_executor = ThreadPoolExecutor(max_workers=SEARCH_FANOUT_WORKERS, thread_name_prefix="search-fanout")
+        # ef HNSW et rescoring des vecteurs quantifiés, appliqués à chaque recherche
+        self._search_params = build_search_params()
 
-    def _initialize_embeddings(self):
-        """Initialise les modèles d'embeddings"""
-        print("🔧 Initialisation des modèles d'embeddings...")
-        
-        self._embeddings = HuggingFaceEmbeddings(
-            model_name=self._embeddings,
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"device": "cpu"}  
-        )
-        
-        self._sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
-        print("✅ Modèles d'embeddings initialisés")
+        # Cache des vecteurs de requêtes : une requête déjà vue n'est pas ré-encodée
+        self._dense_cache = QueryCache()
+        self._sparse_cache = QueryCache()
+        if EMBEDDING_CACHE_PATH:
+            self._dense_cache.load(f"{EMBEDDING_CACHE_PATH}.dense")
+            self._sparse_cache.load(f"{EMBEDDING_CACHE_PATH}.sparse")
+            atexit.register(self._save_caches)
+
+        if not lazy:
+            self.load()
+
+    def load(self):
+        """Chargement complet, étape par étape : modèles d'embeddings, connexion, vectorstores"""
+        self.load_dense_embeddings()
+        self.load_sparse_embeddings()
+        self.connect()
+        self.build_vectorstores()
+
+    def load_dense_embeddings(self):
+        """Charge le modèle d'embedding dense (partagé avec les indexeurs et les recherches)"""
+        if isinstance(self._embeddings, CachedEmbeddings):
+            return
+        print("🔧 Initialisation du modèle d'embedding dense...")
+        # Nom de modèle ou modèle déjà chargé
+        if isinstance(self._embeddings, str) or self._embeddings is None:
+            self._embeddings = get_embedding_backend(self._embeddings)
+        if EMBEDDING_BATCHING:
+            # Requêtes simultanées encodées ensemble (les requêtes en cache ne passent pas par la file)
+            self._batcher = BatchingEmbeddings(self._embeddings)
+            self._embeddings = self._batcher
+        self._embeddings = CachedEmbeddings(self._embeddings, self._dense_cache)
+        print("✅ Modèle d'embedding dense initialisé")
+
+    def load_sparse_embeddings(self):
+        """Charge le modèle d'embedding creux (BM25)"""
+        if self._sparse_embeddings is not None:
+            return
+        print("🔧 Initialisation du modèle d'embedding creux...")
+        self._sparse_embeddings = CachedSparseEmbeddings(FastEmbedSparse(model_name="Qdrant/bm25"), self._sparse_cache)
+        print("✅ Modèle d'embedding creux initialisé")
+
+    def _save_caches(self):
+        """Sauvegarde les caches d'embeddings de requêtes sur disque"""
+        try:
+            self._dense_cache.save(f"{EMBEDDING_CACHE_PATH}.dense")
+            self._sparse_cache.save(f"{EMBEDDING_CACHE_PATH}.sparse")
+        except Exception as e:
+            print(f"⚠️ Impossible de sauvegarder le cache d'embeddings: {e}")
+
+    def get_batching_stats(self) -> Optional[Dict[str, Any]]:
+        """Retourne la file et les latences du regroupement des embeddings de requêtes (None si désactivé)"""
+        return self._batcher.stats() if self._batcher is not None else None
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Retourne les compteurs de succès/échecs des caches d'embeddings"""
+        return {
+            "dense": self._dense_cache.stats(),
+            "sparse": self._sparse_cache.stats(),
+        }
     
-    def _try_connect_qdrant(self) -> Optional[QdrantVectorStore]:
+    def _try_connect_qdrant(self) -> bool:
         """
         Tente de se connecter à la base de données Qdrant.
-        Si la connexion échoue, supprime le fichier de verrouillage.
+        Retourne False si la connexion échoue.
         """
         try:
-            return self._connect_qdrant()
+            client = get_qdrant_client()
+            # Vérifie que le serveur répond (la base locale est ouverte à la création du client)
+            client.get_collections()
         except Exception as e:
-            if "./qdrant_db is already accessed" in str(e):
-                os.remove("./qdrant_db/.lock")
+            if "already accessed" in str(e):
+                # Base locale ouverte par un autre processus : son verrou ne doit jamais être supprimé
+                print(f"❌ {QDRANT_PATH} est déjà utilisée par un autre processus. "
+                      "Pour lancer plusieurs workers, utiliser un serveur Qdrant (QDRANT_URL)")
+            else:
+                print(f"❌ Connexion à Qdrant ({describe_backend()}) impossible: {e}")
+            close_clients()
             return False
-    
-    def _connect_qdrant(self) -> QdrantVectorStore:
-        """Établit la connexion à Qdrant"""
-        return QdrantVectorStore.from_existing_collection(
-            embedding=self._embeddings,
-            collection_name=self._collection_name,
-            path="./qdrant_db",
-            retrieval_mode=RetrievalMode.HYBRID,
-            vector_name="dense",
-            sparse_vector_name="sparse",
-            sparse_embedding=self._sparse_embeddings,
-        )
-    
-    def _connect(self) -> bool:
-        for i in range(3):
-            print(f"Connexion à la base de données Qdrant (tentative {i+1}/3)...")
-            self._vectorstore = self._try_connect_qdrant()
-            if self._vectorstore is not False:
+        self._client = client
+        # Recherches asynchrones sans thread bloqué (mode serveur uniquement)
+        self._async_client = get_async_qdrant_client()
+        return True
+
+    def connect(self):
+        """
+        Établit la connexion à Qdrant avec le client partagé du processus (serveur ou base locale),
+        indépendamment du chargement des modèles.
+        """
+        if self._client is not None:
+            return
+        for i in range(CONNECT_ATTEMPTS):
+            print(f"Connexion à la base de données Qdrant ({describe_backend()}, tentative {i+1}/{CONNECT_ATTEMPTS})...")
+            if self._try_connect_qdrant():
                 break
+            if i + 1 < CONNECT_ATTEMPTS:
+                time.sleep(CONNECT_RETRY_DELAY)
+        if self._client is None:
+            raise Exception("❌ Impossible d'établir la connexion à la base de données")
+        print("✅ Base de données Qdrant connectée avec succès")
+
+    def build_vectorstores(self):
+        """
+        Crée un vectorstore par collection, une fois les modèles chargés et la connexion établie.
+        Les collections secondaires pas encore indexées sont ignorées.
+        """
+        if self._vectorstore is not None:
+            return
+        vectorstores = {}
+        for collection_name in self._collection_names:
+            if collection_name != self._collection_name and not self._client.collection_exists(collection_name):
+                print(f"⚠️ Collection '{collection_name}' introuvable, ignorée")
+                continue
+            vectorstores[collection_name] = QdrantVectorStore(
+                client=self._client,
+                collection_name=collection_name,
+                embedding=self._embeddings,
+                retrieval_mode=RetrievalMode.HYBRID,
+                vector_name="dense",
+                sparse_vector_name="sparse",
+                sparse_embedding=self._sparse_embeddings,
+            )
+        self._vectorstores = vectorstores
+        self._collection_names = list(vectorstores)
+        # Index de filtrage des seules collections présentes
+        self._ensure_payload_indexes()
+        self._vectorstore = vectorstores[self._collection_name]
+
+    def is_ready(self) -> bool:
+        """Vrai si les recherches sont possibles (modèles chargés, connexion et vectorstores prêts)"""
         return self._vectorstore is not None
+
+    def _ensure_payload_indexes(self):
+        """Crée les index des champs filtrables (livre, titre, articles) s'ils n'existent pas"""
+        for collection_name in self._collection_names:
+            try:
+                ensure_payload_indexes(self._client, collection_name)
+            except Exception as e:
+                print(f"⚠️ Impossible de créer les index de filtrage ({collection_name}): {e}")
     
-    def get_vectorstore(self) -> Optional[QdrantVectorStore]:
-        """Retourne l'instance du vectorstore"""
-        return self._vectorstore
+    def get_collection_name(self) -> str:
+        """Retourne le nom de la collection interrogée par défaut"""
+        return self._collection_name
+
+    def get_collection_names(self) -> List[str]:
+        """Retourne les noms de toutes les collections interrogeables"""
+        return list(self._collection_names)
+
+    def get_vectorstore(self, collection_name: Optional[str] = None) -> Optional[QdrantVectorStore]:
+        """Retourne l'instance du vectorstore (de la collection par défaut si non précisée)"""
+        if collection_name is None:
+            return self._vectorstore
+        return self._vectorstores.get(collection_name)
+
+    def route(self, query: str) -> List[str]:
+        """
+        Choisit les collections à interroger : celles dont le code est cité dans la question
+        (ex: "code pénal" -> code-penal-2), toutes sinon.
+        """
+        normalized_query = _normalize_text(query)
+        cited = [
+            name for name in self._collection_names
+            if f" {_collection_keywords(name)} " in f" {normalized_query} "
+        ]
+        return cited or list(self._collection_names)
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        filter: Optional[models.Filter] = None,
+        collection_names: Optional[List[str]] = None
+    ) -> List[Document]:
+        """
+        Recherche hybride sur une ou plusieurs collections, interrogées en parallèle.
+        Les résultats sont fusionnés par score (chaque document garde "_collection_name").
+
+        :param query: La requête utilisateur
+        :param k: Nombre de documents à retourner au total
+        :param filter: Filtre Qdrant appliqué dans chaque collection
+        :param collection_names: Collections à interroger (par défaut : routage selon la question)
+        :return: Les k documents les mieux classés, toutes collections confondues
+        """
+        collection_names = collection_names or self.route(query)
+        if len(collection_names) == 1:
+            return self._vectorstores[collection_names[0]].similarity_search(
+                query, k=k, filter=filter, search_params=self._search_params
+            )
+
+        # Vecteurs de la requête calculés une fois (mis en cache) avant la répartition
+        self._embeddings.embed_query(query)
+        self._sparse_embeddings.embed_query(query)
+
+        futures = [
+            self._search_executor.submit(
+                self._vectorstores[collection_name].similarity_search_with_score,
+                query, k=k, filter=filter, search_params=self._search_params
+            )
+            for collection_name in collection_names
+        ]
+        results = [result for future in futures for result in future.result()]
+        results.sort(key=lambda result: result[1], reverse=True)
+        return [document for document, _ in results[:k]]
     
+
+    def supports_async(self) -> bool:
+        """Vrai si les recherches peuvent passer par le client asynchrone (serveur Qdrant)"""
+        return self._async_client is not None
+
+    @staticmethod
+    def _document_from_point(point: models.ScoredPoint, collection_name: str) -> Document:
+        """Convertit un point Qdrant en document, au même format que QdrantVectorStore"""
+        payload = point.payload or {}
+        metadata = dict(payload.get("metadata") or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = collection_name
+        return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+    async def _asearch_collection(
+        self,
+        collection_name: str,
+        dense_vector: List[float],
+        sparse_vector,
+        k: int,
+        filter: Optional[models.Filter]
+    ) -> List[Tuple[Document, float]]:
+        """Recherche hybride (dense + sparse, fusion RRF) dans une collection via le client asynchrone"""
+        response = await self._async_client.query_points(
+            collection_name=collection_name,
+            prefetch=[
+                models.Prefetch(using="dense", query=dense_vector, filter=filter, limit=k, params=self._search_params),
+                models.Prefetch(
+                    using="sparse",
+                    query=models.SparseVector(indices=sparse_vector.indices, values=sparse_vector.values),
+                    filter=filter,
+                    limit=k,
+                    params=self._search_params
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            query_filter=filter,
+            search_params=self._search_params,
+            limit=k,
+            with_payload=True,
+            with_vectors=False
+        )
+        return [(self._document_from_point(point, collection_name), point.score) for point in response.points]
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """Vecteur dense de la requête, sans bloquer de thread pendant le regroupement (mis en cache)"""
+        return await self._embeddings.aembed_query(query)
+
+    async def asearch(
+        self,
+        query: str,
+        k: int,
+        filter: Optional[models.Filter] = None,
+        collection_names: Optional[List[str]] = None
+    ) -> List[Document]:
+        """
+        Version asynchrone de search : le vecteur dense est calculé par la file de regroupement
+        et le vecteur creux dans le pool de threads, puis les collections sont interrogées simultanément par le client asynchrone.
+        Sans serveur Qdrant, la recherche synchrone est exécutée dans un thread.
+        """
+        collection_names = collection_names or self.route(query)
+        loop = asyncio.get_running_loop()
+        if not self.supports_async():
+            return await loop.run_in_executor(None, partial(self.search, query, k, filter, collection_names))
+
+        dense_vector, sparse_vector = await asyncio.gather(
+            self._embeddings.aembed_query(query),
+            loop.run_in_executor(self._search_executor, self._sparse_embeddings.embed_query, query)
+        )
+        results = await asyncio.gather(*(
+            self._asearch_collection(collection_name, dense_vector, sparse_vector, k, filter)
+            for collection_name in collection_names
+        ))
+        merged = [result for collection_results in results for result in collection_results]
+        merged.sort(key=lambda result: result[1], reverse=True)
+        return [document for document, _ in merged[:k]]
@@ -0,0 +1,165 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+# Configuration
+DEFAULT_EMBEDDED_MODEL = "BAAI/bge-m3"
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" (PyTorch) ou "onnx" (ONNX Runtime, CPU)
+# Quantization int8 dynamique du modèle ONNX : "none", "avx2", "avx512", "avx512_vnni" ou "arm64"
+EMBEDDING_ONNX_QUANTIZATION = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx2")
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))  # Threads ONNX Runtime par encodage (0 = tous les cœurs)
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "./onnx_models")  # Modèles exportés et quantifiés
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+ONNX_QUANTIZATIONS = ("none", "avx2", "avx512", "avx512_vnni", "arm64")
+
+
+def load_onnx_model(model_name: str, quantization: str = EMBEDDING_ONNX_QUANTIZATION, threads: int = EMBEDDING_ONNX_THREADS):
+    """
+    Charge le modèle avec ONNX Runtime sur CPU. Au premier chargement, le modèle est exporté
+    en ONNX puis quantifié en int8 (quantization dynamique) dans EMBEDDING_ONNX_DIR ;
+    les chargements suivants réutilisent ces fichiers.
+
+    :param model_name: Nom du modèle sentence-transformers
+    :param quantization: Jeu d'instructions ciblé par la quantization int8 ("none" = float32)
+    :param threads: Nombre de threads ONNX Runtime (0 = tous les cœurs)
+    :return: SentenceTransformer utilisant ONNX Runtime
+    """
+    if quantization not in ONNX_QUANTIZATIONS:
+        raise ValueError(f"Quantization ONNX inconnue: {quantization} (attendu: {', '.join(ONNX_QUANTIZATIONS)})")
+    # Dépendances optionnelles : pip install "optimum[onnxruntime]"
+    import onnxruntime
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    session_options = onnxruntime.SessionOptions()
+    if threads > 0:
+        session_options.intra_op_num_threads = threads
+    model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+
+    export_dir = Path(EMBEDDING_ONNX_DIR) / model_name.replace("/", "--")
+    if not (export_dir / "onnx" / "model.onnx").exists():
+        print(f"🔧 Export ONNX de {model_name} vers {export_dir}...")
+        SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs).save(str(export_dir))
+
+    file_name = "onnx/model.onnx"
+    if quantization != "none":
+        file_name = f"onnx/model_qint8_{quantization}.onnx"
+        if not (export_dir / file_name).exists():
+            print(f"🔧 Quantization int8 ({quantization}) de {model_name}...")
+            # Suffixe explicite : le nom par défaut dépend du type de poids (qint8 ou quint8 selon la cible)
+            export_dynamic_quantized_onnx_model(
+                SentenceTransformer(str(export_dir), backend="onnx", model_kwargs=model_kwargs),
+                quantization,
+                str(export_dir),
+                file_suffix=f"qint8_{quantization}"
+            )
+    return SentenceTransformer(str(export_dir), backend="onnx", model_kwargs={**model_kwargs, "file_name": file_name})
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Modèle d'embedding dense unique, utilisable à la fois par LangChain (QdrantVectorStore)
+    et directement par les indexeurs (encode -> numpy). Le modèle tourne avec PyTorch ou,
+    sur CPU, avec ONNX Runtime (éventuellement quantifié en int8).
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str = EMBEDDING_DEVICE,
+        normalize: bool = True,
+        backend: str = EMBEDDING_BACKEND,
+        onnx_quantization: str = EMBEDDING_ONNX_QUANTIZATION,
+        onnx_threads: int = EMBEDDING_ONNX_THREADS
+    ):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Backend d'embedding inconnu: {backend} (attendu: {', '.join(EMBEDDING_BACKENDS)})")
+        self.model_name = model_name
+        self.normalize = normalize
+        self.backend = backend
+        if backend == "onnx":
+            print(f"🔧 Chargement du modèle d'embedding {model_name} (ONNX Runtime, quantization {onnx_quantization})...")
+            self.model = load_onnx_model(model_name, onnx_quantization, onnx_threads)
+            device = "cpu"
+        else:
+            print(f"🔧 Chargement du modèle d'embedding {model_name} ({device})...")
+            # Import différé : torch n'est chargé qu'avec le premier modèle
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(model_name, device=device)
+        self._device = device
+        self._pool = None
+
+    @property
+    def dimension(self) -> int:
+        """Dimension des vecteurs, lue dans la configuration du modèle (sans encodage)"""
+        return self.model.get_sentence_embedding_dimension()
+
+    def start_pool(self, processes: int):
+        """
+        Démarre un pool de processus d'encodage (un modèle par processus).
+        Tant que le pool est actif, encode() répartit les textes entre les processus.
+        """
+        self.stop_pool()
+        if self.backend == "onnx":
+            # ONNX Runtime répartit déjà chaque encodage sur plusieurs threads
+            return
+        if processes > 1:
+            print(f"🔧 Démarrage de {processes} processus d'encodage...")
+            self._pool = self.model.start_multi_process_pool(target_devices=[self._device] * processes)
+
+    def stop_pool(self):
+        """Arrête le pool de processus d'encodage s'il existe"""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Encode une liste de textes.
+
+        :return: Matrice float32 (len(texts), dimension)
+        """
+        if self._pool is not None:
+            return self.model.encode_multi_process(
+                texts,
+                self._pool,
+                batch_size=batch_size,
+                normalize_embeddings=self.normalize
+            ).astype(np.float32, copy=False)
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=self.normalize,
+            show_progress_bar=show_progress_bar,
+            convert_to_numpy=True
+        ).astype(np.float32, copy=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+_backends: Dict[Tuple[str, str], SentenceTransformerEmbeddings] = {}
+_lock = threading.Lock()
+
+
+def get_embedding_backend(model_name: Optional[str] = None, backend: Optional[str] = None) -> SentenceTransformerEmbeddings:
+    """
+    Retourne le modèle d'embedding partagé du processus : les poids ne sont chargés qu'une fois
+    quel que soit le nombre de composants (indexeurs, DatabaseManager, recherches) qui l'utilisent.
+    Les collections doivent être interrogées avec le backend qui les a indexées (ou un backend
+    dont l'accord a été vérifié avec embedding_benchmark.py).
+    """
+    model_name = model_name or os.getenv("EMBEDDED_MODEL") or DEFAULT_EMBEDDED_MODEL
+    backend = backend or os.getenv("EMBEDDING_BACKEND") or EMBEDDING_BACKEND
+    with _lock:
+        if (model_name, backend) not in _backends:
+            _backends[(model_name, backend)] = SentenceTransformerEmbeddings(model_name, backend=backend)
+        return _backends[(model_name, backend)]
@@ -0,0 +1,190 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence
+from langchain_core.embeddings import Embeddings
+
+
+# Configuration
+EMBEDDING_BATCHING = os.getenv("EMBEDDING_BATCHING", "true").lower() in ("1", "true", "yes")
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))  # Requêtes encodées ensemble au maximum
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))  # Attente maximale des requêtes suivantes
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram:
+    """Histogramme cumulatif à seuils fixes, avec percentiles calculés sur les dernières valeurs"""
+
+    def __init__(self, buckets: Sequence[float], window: int = 2048):
+        self._buckets = tuple(buckets)
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._recent = deque(maxlen=window)
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect_left(self._buckets, value)] += 1
+            self._recent.append(value)
+            self._total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            recent = sorted(self._recent)
+            total = self._total
+        count = sum(counts)
+
+        def percentile(q: float) -> Optional[float]:
+            return round(recent[min(int(q * len(recent)), len(recent) - 1)], 3) if recent else None
+
+        labels = [f"<={bound}" for bound in self._buckets] + [f">{self._buckets[-1]}"]
+        return {
+            "count": count,
+            "mean": round(total / count, 3) if count else None,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "buckets": dict(zip(labels, counts)),
+        }
+
+
+class _PendingQuery:
+    """Requête en attente d'encodage : texte, instant d'arrivée et vecteur à remettre à l'appelant"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.enqueued_at = time.perf_counter()
+        self.future: Future = Future()
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Regroupe les requêtes simultanées en un seul encodage. Le premier appel d'un lot attend au
+    plus max_wait_ms les requêtes suivantes (jusqu'à max_batch_size), puis le lot est encodé
+    en une passe du modèle par un thread unique et chaque appelant reçoit son vecteur.
+    Les documents (indexation) ne passent pas par la file.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBEDDING_BATCH_MAX_WAIT_MS
+    ):
+        self.embeddings = embeddings
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[_PendingQuery]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.encode_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    @property
+    def dimension(self) -> int:
+        return self.embeddings.dimension
+
+    def _submit(self, text: str) -> _PendingQuery:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+            self.requests += 1
+        pending = _PendingQuery(text)
+        self._queue.put(pending)
+        return pending
+
+    def _next_batch(self) -> List[_PendingQuery]:
+        """Attend une requête puis celles qui arrivent dans la fenêtre de regroupement"""
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Les requêtes déjà en file sont prises même après la fin de la fenêtre
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Encode un lot en une passe (modèle sentence-transformers) ou requête par requête sinon"""
+        if hasattr(self.embeddings, "encode"):
+            return self.embeddings.encode(texts, batch_size=len(texts)).tolist()
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    @staticmethod
+    def _resolve(pending: _PendingQuery, vector: Optional[List[float]] = None, error: Optional[Exception] = None):
+        """Remet le résultat à l'appelant, sauf s'il a abandonné (requête annulée, délai dépassé)"""
+        if not pending.future.set_running_or_notify_cancel():
+            return
+        try:
+            if error is not None:
+                pending.future.set_exception(error)
+            else:
+                pending.future.set_result(vector)
+        except Exception as e:
+            print(f"⚠️ Résultat d'embedding non transmis: {e}")
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Les requêtes annulées pendant l'attente ne sont pas encodées
+            batch = [pending for pending in batch if not pending.future.cancelled()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            # Une même question posée plusieurs fois dans le lot n'est encodée qu'une fois
+            texts = list(dict.fromkeys(pending.text for pending in batch))
+            try:
+                vectors = dict(zip(texts, self._encode(texts)))
+            except Exception as e:
+                for pending in batch:
+                    self._resolve(pending, error=e)
+                continue
+            finished = time.perf_counter()
+
+            self.batches += 1
+            self.batch_sizes.observe(len(batch))
+            self.encode_ms.observe((finished - started) * 1000)
+            for pending in batch:
+                self.queue_wait_ms.observe((started - pending.enqueued_at) * 1000)
+                self.latency_ms.observe((finished - pending.enqueued_at) * 1000)
+                self._resolve(pending, vectors[pending.text])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._submit(text).future.result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # Aucun thread n'est bloqué pendant l'attente du lot
+        return await asyncio.wrap_future(self._submit(text).future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Profondeur de la file, tailles des lots et latences (ms)"""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "requests": self.requests,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "encode_ms": self.encode_ms.snapshot(),
+            "latency_ms": self.latency_ms.snapshot(),
+        }
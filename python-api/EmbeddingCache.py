@@ -0,0 +1,147 @@
+import os
+import re
+import time
+import pickle
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import SparseEmbeddings, SparseVector
+
+
+# Configuration
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))  # Nombre maximum de requêtes en cache
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "86400"))  # Durée de vie d'une entrée (secondes)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")  # Fichier de persistance (vide = désactivé)
+
+
+def normalize_query(query: str) -> str:
+    """Normalise le texte d'une requête pour servir de clé de cache"""
+    query = unicodedata.normalize("NFC", query)
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class QueryCache:
+    """Cache LRU avec durée de vie, partagé entre threads (vecteurs de requêtes, résultats de recherche)"""
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE, ttl: float = EMBEDDING_CACHE_TTL):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self._ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, query: str, compute: Callable[[str], Any]) -> Any:
+        """
+        Retourne le vecteur en cache ou le calcule avec la fonction fournie.
+
+        :param query: Texte de la requête
+        :param compute: Fonction d'embedding appelée en cas d'absence dans le cache
+        :return: Vecteur de la requête
+        """
+        key = normalize_query(query)
+        value = self.get(key)
+        if value is None:
+            value = compute(query)
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+    def save(self, path: str):
+        """Sauvegarde les entrées encore valides sur disque"""
+        with self._lock:
+            entries = list(self._entries.items())
+        # Écriture atomique : plusieurs workers peuvent sauvegarder le même fichier
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(entries, file)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        """Recharge les entrées sauvegardées, en ignorant celles qui ont expiré"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "rb") as file:
+                entries = pickle.load(file)
+        except Exception as e:
+            print(f"⚠️ Impossible de charger le cache d'embeddings {path}: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, (timestamp, value) in entries:
+                if now - timestamp <= self._ttl:
+                    self._entries[key] = (timestamp, value)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        print(f"✅ {len(self._entries)} embeddings de requêtes rechargés depuis {path}")
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings denses dont les vecteurs de requêtes sont mis en cache"""
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[QueryCache] = None):
+        self.embeddings = embeddings
+        self.cache = cache or QueryCache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.cache.get_or_compute(text, self.embeddings.embed_query)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        value = self.cache.get(key)
+        if value is None:
+            value = await self.embeddings.aembed_query(text)
+            self.cache.set(key, value)
+        return value
+
+
+class CachedSparseEmbeddings(SparseEmbeddings):
+    """Embeddings creux (BM25) dont les vecteurs de requêtes sont mis en cache"""
+
+    def __init__(self, sparse_embeddings: SparseEmbeddings, cache: Optional[QueryCache] = None):
+        self.sparse_embeddings = sparse_embeddings
+        self.cache = cache or QueryCache()
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        return self.sparse_embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> SparseVector:
+        return self.cache.get_or_compute(text, self.sparse_embeddings.embed_query)
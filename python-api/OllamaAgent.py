@@ -1,26 +1,29 @@
 import os
 import re
 import json
-from typing import List, Generator
+import time
+import asyncio
+from typing import List, Dict, AsyncGenerator, Tuple
 from langchain_core.messages import (
     ToolMessage
 )
-from langchain_core.tools import tool
+from langchain_core.tools import tool, BaseTool
 from DatabaseManager import DatabaseManager
 from VectorStore import VectorStore
+from Reranker import CrossEncoderReranker, RERANK_ENABLED
 from langchain_ollama import ChatOllama
 from utils import convert_prompt_to_langchain_messages, get_specific_civil_code_article as get_article
 from dotenv import load_dotenv
 
 load_dotenv("../.env")
 
-user_messages = []  # Liste pour stocker les messages de l'utilisateur # Pas utilisé pour actuellement
-
 MAX_TOKENS = 4096  # Nombre maximum de tokens pour le modèle
 MAX_ITERATIONS = 3  # Nombre maximum d'itérations pour la conversation
 
-db_manager = DatabaseManager(os.getenv("EMBEDDED_MODEL"))
-vectorstore = VectorStore(db_manager=db_manager)
+# Modèles et connexion chargés en arrière-plan au démarrage de l'API (voir main.py)
+db_manager = DatabaseManager(os.getenv("EMBEDDED_MODEL"), lazy=True)
+reranker = CrossEncoderReranker() if RERANK_ENABLED else None
+vectorstore = VectorStore(db_manager=db_manager, reranker=reranker)
 llm = ChatOllama(
             model=os.getenv("OLLAMA_MODEL"),
             temperature=0.7,
@@ -43,37 +46,70 @@ def get_specific_civil_code_article(article_number: str) -> str:
     return get_article(article_number)
 
 
-# Pas utilisé actuellement
-@tool
-def get_previous_user_message() -> List[str]:
+class AgentContext:
     """
-    A utiliser lorsque tu ne comprends pas la question de l'utilisateur pour voir ce qu'il a dit précédemment.
-    Récupère le dernier message de l'utilisateur.
-        return: Dernier message de l'utilisateur
+    État propre à une requête de l'agent : historique de l'utilisateur, résultats des outils
+    et cache des recherches. Chaque requête possède son propre contexte, aucun état n'est
+    partagé entre conversations simultanées.
     """
-    global user_messages
 
-    if not user_messages:
-        return "Aucun message utilisateur précédent disponible."
-    return [message for message in user_messages]
+    def __init__(self, user_messages: List[str]):
+        self.user_messages = user_messages
+        self.tool_results: List[ToolMessage] = []
+        self.retrieval_cache: Dict[str, str] = {}
 
+    async def get_context(self, query: str) -> str:
+        """Recherche dans le code civil en réutilisant les résultats déjà obtenus pour cette requête"""
+        if query not in self.retrieval_cache:
+            self.retrieval_cache[query] = await vectorstore.aget_context(query)
+        return self.retrieval_cache[query]
 
-@tool
-def get_context_on_french_civil_code(query: str) -> str:
+
+def build_tools(context: AgentContext) -> Dict[str, BaseTool]:
     """
-    Permet de faire une recherche à l'intérieur du code civil français.
-        param query: La requête utilisateur
-        return: Contexte issus du code civil français
+    Construit les outils liés au contexte d'une requête.
+        param context: Contexte de la requête en cours
+        return: Outils disponibles, indexés par nom
     """
 
-    context = vectorstore.get_context(query)
-    print(f"Contexte récupéré pour la requête '{query}': {context[:100]}...")  # Affiche les 100 premiers caractères du contexte
-    return context
-
+    # Pas utilisé actuellement
+    @tool
+    def get_previous_user_message() -> List[str]:
+        """
+        A utiliser lorsque tu ne comprends pas la question de l'utilisateur pour voir ce qu'il a dit précédemment.
+        Récupère le dernier message de l'utilisateur.
+            return: Dernier message de l'utilisateur
+        """
+        if not context.user_messages:
+            return "Aucun message utilisateur précédent disponible."
+        return [message for message in context.user_messages]
+
+    @tool
+    async def get_context_on_french_civil_code(query: str) -> str:
+        """
+        Permet de faire une recherche à l'intérieur du code civil français.
+            param query: La requête utilisateur
+            return: Contexte issus du code civil français
+        """
+
+        result = await context.get_context(query)
+        print(f"Contexte récupéré pour la requête '{query}': {result[:100]}...")  # Affiche les 100 premiers caractères du contexte
+        return result
+
+    return {
+        "get_context_on_french_civil_code": get_context_on_french_civil_code,
+        "get_previous_user_message": get_previous_user_message,
+        "get_specific_civil_code_article": get_specific_civil_code_article,
+    }
+
+
+DEFAULT_TOOL_TIMEOUT = 30  # Délai maximum d'exécution d'un outil (secondes)
+TOOL_TIMEOUTS = {
+    "get_context_on_french_civil_code": 60,  # Embedding + recherche hybride
+    "get_specific_civil_code_article": 5,
+}
 
 
-    
-
 class OllamaAgent:
     def __init__(self):
         self._max_iterations = MAX_ITERATIONS
@@ -81,9 +117,40 @@ class OllamaAgent:
         # Initialiser le LLM avec des paramètres optimisés
         self._llm = llm
 
-    def process_message(self, messages: list[dict[str,str]]) -> Generator[str, None, None]:
-        global user_messages
-
+    async def _run_tool_call(self, tool_call: dict, tools: Dict[str, BaseTool], context: AgentContext) -> ToolMessage:
+        """
+        Exécute un appel d'outil avec un délai maximum et journalise sa latence.
+            param tool_call: Appel d'outil renvoyé par le LLM
+            param tools: Outils liés à la requête en cours
+            param context: Contexte de la requête en cours
+            return: Résultat de l'outil sous forme de ToolMessage
+        """
+        name = tool_call["name"]
+        start_time = time.perf_counter()
+
+        if name not in tools:
+            content = f"Erreur: l'outil {name} n'existe pas."
+        else:
+            print(f"🔧 Utilisation de l'outil {name}")
+            try:
+                timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+                content = str(await asyncio.wait_for(tools[name].ainvoke(tool_call["args"]), timeout=timeout))
+            except asyncio.TimeoutError:
+                content = f"Erreur: l'outil {name} n'a pas répondu dans les temps."
+            except Exception as e:
+                content = f"Erreur lors de l'exécution de l'outil {name}: {str(e)}"
+
+        print(f"⏱️ Outil {name} exécuté en {time.perf_counter() - start_time:.2f}s")
+        tool_message = ToolMessage(content=content, tool_call_id=tool_call["id"])
+        context.tool_results.append(tool_message)
+        return tool_message
+
+    def _prepare_messages(self, messages: list[dict[str,str]]) -> Tuple[list, AgentContext, Dict[str, BaseTool]]:
+        """
+        Construit l'historique envoyé au LLM et les outils propres à la requête.
+            param messages: Messages de la conversation
+            return: Messages LangChain (prompt système compris), contexte et outils propres à la requête
+        """
         system_message = {
             "role": "system",
             "content": """   
@@ -116,7 +183,7 @@ class OllamaAgent:
         }
 
         processed_messages = []
-        user_messages = [] # Réinitialiser la liste des messages de l'utilisateur
+        user_messages = [] # Messages de l'utilisateur propres à cette requête
 
         # Limiter le nombre de messages à 10 derniers messages pour éviter les surcharges
         for message_num in range(len(messages)-1, len(messages) - 11, -1):
@@ -131,46 +198,63 @@ class OllamaAgent:
                 user_messages.append(message["content"])
 
 
-        # Créer un agent React avec les outils nécessaires
-        agent = self._llm.bind_tools([get_context_on_french_civil_code, get_specific_civil_code_article])
+        # Contexte et outils propres à cette requête
+        context = AgentContext(user_messages)
+        tools = build_tools(context)
+
         processed_messages.insert(0, system_message)
-        processed_messages = convert_prompt_to_langchain_messages(processed_messages)
+        return convert_prompt_to_langchain_messages(processed_messages), context, tools
+
+    def _bind_tools(self, tools: Dict[str, BaseTool]):
+        """LLM ayant accès aux outils de recherche dans le code civil"""
+        return self._llm.bind_tools([tools["get_context_on_french_civil_code"], tools["get_specific_civil_code_article"]])
+
+    async def process_message(self, messages: list[dict[str,str]]) -> AsyncGenerator[str, None]:
+        processed_messages, context, tools = self._prepare_messages(messages)
+
+        # Créer un agent React avec les outils nécessaires
+        agent = self._bind_tools(tools)
+
+        start_time = time.perf_counter()
+        first_token_time = None
 
         for i in range(1, self._max_iterations+1):
-            # Appel au LLM
-            response = agent.invoke(processed_messages)
+            # Au dernier tour, le LLM n'a plus accès aux outils et doit répondre
+            model = agent if i < self._max_iterations else self._llm
+
+            # Appel au LLM en streaming : une seule génération par tour
+            response = None
+            async for chunk in model.astream(processed_messages):
+                response = chunk if response is None else response + chunk
+
+                # Tant qu'aucun appel d'outil n'est détecté, le texte est transmis directement au client
+                if chunk.content and not response.tool_call_chunks:
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter() - start_time
+                        print(f"⏱️ Premier token après {first_token_time:.2f}s")
+                    yield chunk.content
 
             # Vérifier s'il y a des appels d'outils
-            if response.tool_calls and i < self._max_iterations:
+            if response is not None and response.tool_calls:
                 
-                
-                # Traiter tous les appels d'outils
-                tools_results = []
-                for tool_call in response.tool_calls:
-                    if tool_call["name"] == "get_context_on_french_civil_code":
-                        print("🔧 Utilisation de l'outil de récupération de contexte")
-                        content = str(get_context_on_french_civil_code.invoke(tool_call["args"]))
-                        tools_results.append(ToolMessage(content=content, tool_call_id=tool_call["id"]))
-                    elif tool_call["name"] == "get_previous_user_message":
-                        print("🔧 Utilisation de l'outil de récupération du message utilisateur précédent")
-                        content = str(get_previous_user_message.invoke(tool_call["args"]))
-                        tools_results.append(ToolMessage(content=content, tool_call_id=tool_call["id"]))
-                    elif tool_call["name"] == "get_specific_civil_code_article":
-                        print("🔧 Utilisation de l'outil de récupération d'un article spécifique du code civil")
-                        content = str(get_specific_civil_code_article.invoke(tool_call["args"]))
-                        tools_results.append(ToolMessage(content=content, tool_call_id=tool_call["id"]))
+                # Conserver la réponse du LLM pour associer les résultats aux appels d'outils
+                processed_messages.append(response)
+
+                # Traiter tous les appels d'outils en parallèle, en conservant l'ordre des appels
+                tools_results = await asyncio.gather(
+                    *(self._run_tool_call(tool_call, tools, context) for tool_call in response.tool_calls)
+                )
 
                 # Ajouter les résultats des outils aux processed_messages
                 processed_messages.extend(tools_results)
                 continue  # Retourner au début de la boucle pour traiter la réponse suivante
             
             else:
-                # Pas d'appels d'outils, streamer la réponse finale
-                for chunk in agent.stream(processed_messages):
-                    yield chunk.content
-
+                # Pas d'appels d'outils : la réponse finale a déjà été streamée
                 break  # Sortir de la boucle après avoir traité la réponse finale
 
+        print(f"⏱️ Réponse complète en {time.perf_counter() - start_time:.2f}s")
+
 
     
 
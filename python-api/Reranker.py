@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+
+
+# Configuration
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")  # Cross-encoder multilingue léger
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))  # Candidats récupérés par la recherche hybride
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))  # Paires (question, chunk) scorées par passe
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))  # Tokens du cross-encoder par paire
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "300"))  # Au-delà, l'ordre hybride est conservé
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))  # Tokens de contexte envoyés au LLM (num_ctx = 4096)
+TOKENS_PER_WORD = 1.5  # Estimation pour le français (sans le tokenizer du LLM)
+
+RERANKED = "reranked"
+SKIPPED_NOT_LOADED = "skipped_not_loaded"
+SKIPPED_BUDGET = "skipped_budget"
+FAILED = "failed"
+
+
+def estimate_tokens(text: str) -> int:
+    """Nombre approximatif de tokens d'un texte pour le LLM"""
+    return int(len(text.split()) * TOKENS_PER_WORD) + 1
+
+
+def select_within_budget(documents: List[Document], k: int, token_budget: int = CONTEXT_TOKEN_BUDGET) -> List[Document]:
+    """
+    Garde les k premiers documents tant que leur total reste dans le budget de tokens.
+    Le premier document est toujours gardé.
+    """
+    selected = []
+    used = 0
+    for doc in documents:
+        if len(selected) >= k:
+            break
+        tokens = estimate_tokens(doc.page_content)
+        if selected and used + tokens > token_budget:
+            continue
+        selected.append(doc)
+        used += tokens
+    return selected
+
+
+class CrossEncoderReranker:
+    """
+    Réordonne les candidats de la recherche hybride avec un cross-encoder sur CPU.
+    Les paires sont scorées par lots ; si le budget de latence ne permet pas de finir
+    (ou si le modèle n'est pas encore chargé), l'ordre de la recherche hybride est conservé.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        batch_size: int = RERANK_BATCH_SIZE,
+        latency_budget_ms: float = RERANK_LATENCY_BUDGET_MS,
+        max_length: int = RERANK_MAX_LENGTH
+    ):
+        self.model_name = model_name
+        self.batch_size = max(batch_size, 1)
+        self.latency_budget = latency_budget_ms / 1000
+        self.max_length = max_length
+        self._model = None
+        self._pair_cost = 0.0  # Durée mesurée du scoring d'une paire (s), estimée au chargement
+        # Un seul scoring à la fois : le modèle utilise déjà tous les cœurs
+        self._lock = threading.Lock()
+        # Compteurs mis à jour par les threads de recherche, hors du verrou de scoring
+        self._counts_lock = threading.Lock()
+        self.counts = {RERANKED: 0, SKIPPED_NOT_LOADED: 0, SKIPPED_BUDGET: 0, FAILED: 0}
+
+    def load(self):
+        """Charge le cross-encoder (au démarrage de l'API, en arrière-plan)"""
+        if self._model is not None:
+            return
+        print(f"🔧 Chargement du cross-encoder {self.model_name}...")
+        # Import différé : torch n'est chargé qu'avec le modèle
+        from sentence_transformers import CrossEncoder
+        model = CrossEncoder(self.model_name, device="cpu", max_length=self.max_length)
+        # Préchauffage, puis mesure d'un lot complet pour estimer le coût du premier reranking
+        pairs = [("Question de préchauffage", "Texte de préchauffage " * 64)] * self.batch_size
+        model.predict(pairs, batch_size=self.batch_size)
+        start = time.perf_counter()
+        model.predict(pairs, batch_size=self.batch_size)
+        self._pair_cost = (time.perf_counter() - start) / len(pairs)
+        self._model = model
+        print(f"✅ Cross-encoder chargé ({self._pair_cost * 1000:.1f} ms par paire)")
+
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def _score(self, query: str, documents: List[Document], deadline: float) -> Optional[List[float]]:
+        """Scores des documents, ou None si le budget de latence est dépassé"""
+        scores: List[float] = []
+        for start in range(0, len(documents), self.batch_size):
+            pairs = [(query, doc.page_content) for doc in documents[start:start + self.batch_size]]
+            # Un lot qui finirait après l'échéance (d'après le coût mesuré par paire) n'est pas lancé
+            if time.perf_counter() + self._pair_cost * len(pairs) > deadline:
+                # Estimation réduite pour qu'un lot lent isolé ne désactive pas le reranking
+                self._pair_cost /= 2
+                return None
+            batch_start = time.perf_counter()
+            scores.extend(float(score) for score in self._model.predict(pairs, batch_size=self.batch_size))
+            self._pair_cost = (time.perf_counter() - batch_start) / len(pairs)
+            # Un lot plus lent que prévu dépasse le budget : l'ordre hybride est conservé
+            if time.perf_counter() > deadline:
+                return None
+        return scores
+
+    def rerank(self, query: str, documents: List[Document]) -> Tuple[List[Document], str]:
+        """
+        :param query: La requête utilisateur
+        :param documents: Candidats dans l'ordre de la recherche hybride
+        :return: (documents du plus au moins pertinent, statut du reranking)
+        """
+        if not documents:
+            return documents, RERANKED
+        if self._model is None:
+            status = SKIPPED_NOT_LOADED
+        else:
+            deadline = time.perf_counter() + self.latency_budget
+            if not self._lock.acquire(timeout=self.latency_budget):
+                status, scores = SKIPPED_BUDGET, None
+            else:
+                try:
+                    scores = self._score(query, documents, deadline)
+                    status = RERANKED if scores is not None else SKIPPED_BUDGET
+                except Exception as e:
+                    print(f"⚠️ Reranking impossible: {e}")
+                    status, scores = FAILED, None
+                finally:
+                    self._lock.release()
+            if scores is not None:
+                order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+                documents = [documents[i] for i in order]
+        with self._counts_lock:
+            self.counts[status] += 1
+        return documents, status
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counts_lock:
+            counts = dict(self.counts)
+        return {
+            "model": self.model_name,
+            "loaded": self.is_loaded(),
+            "latency_budget_ms": self.latency_budget * 1000,
+            **counts,
+        }
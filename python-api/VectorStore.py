@@ -1,37 +1,199 @@
-from typing import List
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from langchain_core.documents import Document
+from EmbeddingCache import QueryCache, normalize_query
+from collection_version import get_collection_version
+from query_filters import QueryFilters, extract_query_filters
+from EmbeddingBatcher import Histogram, LATENCY_BUCKETS_MS
+from Reranker import CrossEncoderReranker, RERANK_CANDIDATES, CONTEXT_TOKEN_BUDGET, estimate_tokens, select_within_budget
 
 
 
 # Configuration
 VECTOR_TOP_K = 5
+RETRIEVAL_MAX_CONCURRENCY = int(os.getenv("RETRIEVAL_MAX_CONCURRENCY", "4"))  # Recherches simultanées maximum
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))  # Nombre maximum de résultats de recherche en cache
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "86400"))  # Durée de vie d'un résultat (secondes)
+CONTEXT_TOKEN_BUCKETS = (250, 500, 1000, 1500, 2000, 2500, 3000, 4000)
 
 
 
 class VectorStore:
     """Classe utilitaire pour les opérations sur le vectorstore"""
     
-    def __init__(self, db_manager):
-        self.vectorstore = db_manager.get_vectorstore()
+    def __init__(
+        self,
+        db_manager,
+        max_concurrency: int = RETRIEVAL_MAX_CONCURRENCY,
+        reranker: Optional[CrossEncoderReranker] = None
+    ):
+        self._db_manager = db_manager
+        # Reranking optionnel : la recherche récupère plus de candidats, le cross-encoder choisit les meilleurs
+        self._reranker = reranker
+        self._candidate_count = max(RERANK_CANDIDATES, VECTOR_TOP_K) if reranker is not None else VECTOR_TOP_K
+        # Durée de chaque étape (ms) et taille du contexte envoyé au LLM (tokens estimés)
+        self._stage_ms = {stage: Histogram(LATENCY_BUCKETS_MS) for stage in ("search", "rerank", "total")}
+        self._context_tokens = Histogram(CONTEXT_TOKEN_BUCKETS)
+        # Cache des résultats, invalidé quand l'une des collections est réindexée
+        self._result_cache = QueryCache(max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+        # Lue à la première recherche, une fois les collections connues
+        self._collection_version: Optional[str] = None
+        # Pool borné : l'embedding et la recherche Qdrant ne bloquent pas la boucle asyncio
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="retrieval")
+    
+    @property
+    def vectorstore(self):
+        """Vectorstore de la collection par défaut (None tant que la base n'est pas prête)"""
+        return self._db_manager.get_vectorstore()
+
+    @property
+    def _collection_names(self) -> List[str]:
+        # Lu à chaque fois : les collections absentes ne sont écartées qu'une fois la base connectée
+        return self._db_manager.get_collection_names()
+
+    def _get_version(self) -> str:
+        """Version combinée des collections interrogées"""
+        return ":".join(get_collection_version(name) or "" for name in self._collection_names)
+    
+    @staticmethod
+    def _complete_with_unfiltered(documents: List[Document], unfiltered: List[Document], vector_top_k: int) -> List[Document]:
+        """Complète les documents filtrés par ceux de la recherche sans filtre, sans doublons"""
+        seen = {(doc.metadata.get("_collection_name"), doc.metadata.get("_id")) for doc in documents}
+        for doc in unfiltered:
+            if len(documents) >= vector_top_k:
+                break
+            if (doc.metadata.get("_collection_name"), doc.metadata.get("_id")) not in seen:
+                documents.append(doc)
+        return documents
+    
+    def _search(self, query: str, vector_top_k: int, filters: Optional[QueryFilters]) -> List[Document]:
+        """
+        Recherche hybride, restreinte par les filtres s'il y en a. Les documents filtrés
+        (livre, titre, articles cités) passent en premier ; si le filtre en retient moins
+        de vector_top_k, la liste est complétée par la recherche sans filtre.
+        """
+        collection_names = self._db_manager.route(query)
+        if filters is None or filters.is_empty():
+            return self._db_manager.search(query, k=vector_top_k, collection_names=collection_names)
+        
+        documents = self._db_manager.search(
+            query, k=vector_top_k, filter=filters.to_qdrant_filter(), collection_names=collection_names
+        )
+        if len(documents) < vector_top_k:
+            unfiltered = self._db_manager.search(query, k=vector_top_k, collection_names=collection_names)
+            documents = self._complete_with_unfiltered(documents, unfiltered, vector_top_k)
+        return documents
+    
+    async def _asearch(self, query: str, vector_top_k: int, filters: Optional[QueryFilters]) -> List[Document]:
+        """Version asynchrone de _search (client Qdrant asynchrone)"""
+        collection_names = self._db_manager.route(query)
+        if filters is None or filters.is_empty():
+            return await self._db_manager.asearch(query, k=vector_top_k, collection_names=collection_names)
+        
+        documents = await self._db_manager.asearch(
+            query, k=vector_top_k, filter=filters.to_qdrant_filter(), collection_names=collection_names
+        )
+        if len(documents) < vector_top_k:
+            unfiltered = await self._db_manager.asearch(query, k=vector_top_k, collection_names=collection_names)
+            documents = self._complete_with_unfiltered(documents, unfiltered, vector_top_k)
+        return documents
+    
+    def _cache_key(self, query: str, vector_top_k: int, filters: Optional[QueryFilters]) -> str:
+        """Clé du cache de résultats, après avoir vidé le cache si une collection a été réindexée"""
+        version = self._get_version()
+        if version != self._collection_version:
+            if self._collection_version is not None:
+                print(f"🔄 Collections {', '.join(self._collection_names)} réindexées, cache des résultats vidé")
+                self._result_cache.clear()
+            self._collection_version = version
+
+        filters_key = filters.cache_key() if filters is not None else ""
+        return f"{version}:{vector_top_k}:{filters_key}:{normalize_query(query)}"
     
     def _retrieve_documents(
         self,
         query: str,
-        vector_top_k: int = VECTOR_TOP_K
+        vector_top_k: int = VECTOR_TOP_K,
+        filters: Optional[QueryFilters] = None
     ) -> List[Document]:
         """
         Récupère les documents pertinents depuis une base Qdrant avec recherche hybride.
         
         :param query: La requête utilisateur
         :param vector_top_k: Nombre de documents à récupérer via recherche hybride
+        :param filters: Filtres structurés (livre, titre, articles) appliqués à la recherche
         :return: Liste des documents pertinents
         """
-        relevant_docs = self.vectorstore.similarity_search(query, k=vector_top_k)
+        cache_key = self._cache_key(query, vector_top_k, filters)
+        relevant_docs = self._result_cache.get(cache_key)
+        if relevant_docs is None:
+            relevant_docs = self._search(query, vector_top_k, filters)
+            self._result_cache.set(cache_key, relevant_docs)
+
         if not relevant_docs:
             print("Aucun document pertinent trouvé.")
 
         return relevant_docs
 
+    async def _aretrieve_documents(
+        self,
+        query: str,
+        vector_top_k: int = VECTOR_TOP_K,
+        filters: Optional[QueryFilters] = None
+    ) -> List[Document]:
+        """Version asynchrone de _retrieve_documents"""
+        cache_key = self._cache_key(query, vector_top_k, filters)
+        relevant_docs = self._result_cache.get(cache_key)
+        if relevant_docs is None:
+            relevant_docs = await self._asearch(query, vector_top_k, filters)
+            self._result_cache.set(cache_key, relevant_docs)
+
+        if not relevant_docs:
+            print("Aucun document pertinent trouvé.")
+
+        return relevant_docs
+
+    @staticmethod
+    def _extract_filters(query: str) -> QueryFilters:
+        """Livre, titre et articles cités dans la requête"""
+        filters = extract_query_filters(query)
+        if not filters.is_empty():
+            print(f"🔎 Filtres de recherche: {filters}")
+        return filters
+
+    @staticmethod
+    def _build_context(documents: List[Document]) -> str:
+        """Concatène les documents, le plus pertinent en dernier (au plus près de la question)"""
+        top_docs = [doc.page_content for doc in documents]
+        top_docs.reverse()
+        return "\n\n".join(top_docs)
+
+    def _select_documents(self, query: str, candidates: List[Document], started: float) -> List[Document]:
+        """
+        Réordonne les candidats avec le cross-encoder (si activé), garde les VECTOR_TOP_K meilleurs
+        dans le budget de tokens du contexte et enregistre la durée de chaque étape.
+        """
+        searched = time.perf_counter()
+        status = "disabled"
+        if self._reranker is not None:
+            candidates, status = self._reranker.rerank(query, candidates)
+            documents = select_within_budget(candidates, VECTOR_TOP_K, CONTEXT_TOKEN_BUDGET)
+        else:
+            documents = candidates[:VECTOR_TOP_K]
+        finished = time.perf_counter()
+
+        tokens = sum(estimate_tokens(doc.page_content) for doc in documents)
+        self._stage_ms["search"].observe((searched - started) * 1000)
+        self._stage_ms["rerank"].observe((finished - searched) * 1000)
+        self._stage_ms["total"].observe((finished - started) * 1000)
+        self._context_tokens.observe(tokens)
+        print(f"⏱️ Recherche {(searched - started) * 1000:.0f} ms, reranking {(finished - searched) * 1000:.0f} ms "
+              f"({status}), {len(documents)}/{len(candidates)} documents, ~{tokens} tokens")
+        return documents
+
     def get_context(self, query: str) -> str:
         """
         Récupère les documents pertinents depuis une base Qdrant avec recherche hybride
@@ -40,15 +202,49 @@ class VectorStore:
         :param query: La requête utilisateur
         :return: Contexte concaténé des documents pertinents
         """
-        # 1. Recherche hybride
-        documents = self._retrieve_documents(query, vector_top_k=VECTOR_TOP_K)
-        top_docs = [doc.page_content for doc in documents]
-        top_docs.reverse()
+        started = time.perf_counter()
+        # 1. Recherche hybride, restreinte par les livre, titre et articles cités dans la requête
+        candidates = self._retrieve_documents(query, vector_top_k=self._candidate_count, filters=self._extract_filters(query))
         
-        # 2. Construction du contexte
-        context = "\n\n".join(top_docs)
+        # 2. Reranking et sélection dans le budget de tokens
+        documents = self._select_documents(query, candidates, started)
         
-        return context
-    
+        # 3. Construction du contexte
+        return self._build_context(documents)
 
+    def get_cache_stats(self) -> dict:
+        """Retourne les statistiques du cache de résultats"""
+        return {"version": self._collection_version, **self._result_cache.stats()}
 
+    def get_timing_stats(self) -> dict:
+        """Retourne la durée de chaque étape de la récupération (ms) et la taille des contextes"""
+        return {
+            **{f"{stage}_ms": histogram.snapshot() for stage, histogram in self._stage_ms.items()},
+            "context_tokens": self._context_tokens.snapshot(),
+            "reranker": self._reranker.stats() if self._reranker is not None else None,
+        }
+
+    async def aget_context(self, query: str) -> str:
+        """
+        Version asynchrone de get_context. Avec un serveur Qdrant, la recherche passe par le
+        client asynchrone ; sinon l'embedding de la requête et la recherche hybride sont
+        exécutés dans le pool dédié pour ne pas bloquer la boucle d'événements.
+        
+        :param query: La requête utilisateur
+        :return: Contexte concaténé des documents pertinents
+        """
+        if self._db_manager.supports_async():
+            started = time.perf_counter()
+            candidates = await self._aretrieve_documents(
+                query, vector_top_k=self._candidate_count, filters=self._extract_filters(query)
+            )
+            loop = asyncio.get_running_loop()
+            # Le cross-encoder (CPU) tourne dans le pool pour ne pas bloquer la boucle d'événements
+            documents = await loop.run_in_executor(self._executor, self._select_documents, query, candidates, started)
+            return self._build_context(documents)
+        
+        # Vecteur dense calculé avant le pool (borné) : toutes les requêtes simultanées sont
+        # regroupées en un encodage, la recherche le retrouve ensuite dans le cache
+        await self._db_manager.aembed_query(query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.get_context, query)
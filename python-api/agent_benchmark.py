@@ -0,0 +1,108 @@
+import time
+import asyncio
+import argparse
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from OllamaAgent import OllamaAgent, db_manager, llm
+
+
+# Configuration
+SAMPLE_QUESTIONS = [
+    "Quelles sont les conditions de validité d'un contrat ?",
+    "Que dit l'article 1240 du code civil ?",
+    "Quels sont les effets du divorce par consentement mutuel ?",
+    "Qui est responsable du dommage causé par un animal ?",
+    "Quelle est la durée de la prescription de droit commun ?",
+    "Quels sont les droits et devoirs respectifs des époux ?",
+]
+
+
+async def invoke_then_stream(agent: OllamaAgent, messages: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
+    """
+    Ancienne boucle de l'agent (référence) : chaque tour est généré en entier avec ainvoke,
+    puis la réponse finale est générée une seconde fois en streaming.
+    """
+    processed_messages, context, tools = agent._prepare_messages(messages)
+    model = agent._bind_tools(tools)
+
+    for i in range(1, agent._max_iterations + 1):
+        response = await model.ainvoke(processed_messages)
+        if response.tool_calls and i < agent._max_iterations:
+            processed_messages.append(response)
+            processed_messages.extend(await asyncio.gather(
+                *(agent._run_tool_call(tool_call, tools, context) for tool_call in response.tool_calls)
+            ))
+            continue
+        async for chunk in model.astream(processed_messages):
+            yield chunk.content
+        break
+
+
+async def measure(stream: AsyncGenerator[str, None]) -> Tuple[Optional[float], float]:
+    """Délai avant le premier token de la réponse et durée totale (secondes)"""
+    start = time.perf_counter()
+    first_token = None
+    async for token in stream:
+        if token and first_token is None:
+            first_token = time.perf_counter() - start
+    return first_token, time.perf_counter() - start
+
+
+async def benchmark(questions: List[str], repeat: int = 1) -> Dict[str, Dict[str, float]]:
+    """
+    Compare le délai avant le premier token (TTFT) et la durée totale de l'ancienne boucle
+    (invoke puis stream) et de la boucle en streaming de process_message, sur les mêmes questions.
+    Les deux boucles alternent pour ne pas favoriser l'une par le cache du modèle.
+    """
+    agent = OllamaAgent()
+    flows: Dict[str, Callable] = {
+        "invoke + stream": lambda messages: invoke_then_stream(agent, messages),
+        "streaming": agent.process_message,
+    }
+    results = {name: {"ttft": [], "total": []} for name in flows}
+
+    for _ in range(repeat):
+        for question in questions:
+            messages = [{"role": "user", "content": question}]
+            for name, flow in flows.items():
+                ttft, total = await measure(flow(messages))
+                if ttft is not None:
+                    results[name]["ttft"].append(ttft)
+                results[name]["total"].append(total)
+                print(f"{name:<16} | TTFT {ttft or 0:.2f}s | total {total:.2f}s | {question}")
+
+    summary = {}
+    print(f"\n{len(questions) * repeat} questions par boucle")
+    print(f"{'Boucle':<16} | {'TTFT p50':>8} | {'TTFT p95':>8} | {'Total p50':>9} | {'Total p95':>9}")
+    for name, timings in results.items():
+        ttft = timings["ttft"] or [float("nan")]
+        summary[name] = {
+            "ttft_p50": float(np.percentile(ttft, 50)),
+            "ttft_p95": float(np.percentile(ttft, 95)),
+            "total_p50": float(np.percentile(timings["total"], 50)),
+            "total_p95": float(np.percentile(timings["total"], 95)),
+        }
+        row = summary[name]
+        print(f"{name:<16} | {row['ttft_p50']:>7.2f}s | {row['ttft_p95']:>7.2f}s | "
+              f"{row['total_p50']:>8.2f}s | {row['total_p95']:>8.2f}s")
+    return summary
+
+
+def main():
+    """Mesure le gain de la boucle en streaming de l'agent sur le délai avant le premier token"""
+    parser = argparse.ArgumentParser(description="TTFT de l'agent : invoke puis stream contre streaming direct")
+    parser.add_argument("--repeat", type=int, default=1, help="Nombre de passages sur les questions types")
+    args = parser.parse_args()
+
+    # Mêmes composants que ceux chargés au démarrage de l'API
+    db_manager.load_dense_embeddings()
+    db_manager.load_sparse_embeddings()
+    db_manager.connect()
+    db_manager.build_vectorstores()
+    llm.invoke("Bonjour")  # Modèle chargé dans Ollama avant la première mesure
+
+    asyncio.run(benchmark(SAMPLE_QUESTIONS, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
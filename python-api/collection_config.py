@@ -0,0 +1,84 @@
+import os
+from typing import Optional
+from qdrant_client import models
+
+
+# Configuration (appliquée à la création des collections)
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")  # "none", "scalar" (int8) ou "binary"
+QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "false").lower() in ("1", "true", "yes")  # Vecteurs originaux sur disque
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))  # Nombre de voisins par nœud du graphe HNSW
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))  # Voisins explorés à la construction
+
+# Configuration (appliquée à la recherche)
+QDRANT_HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", "0"))  # Voisins explorés à la recherche (0 = défaut Qdrant)
+QDRANT_QUANTIZATION_RESCORE = os.getenv("QDRANT_QUANTIZATION_RESCORE", "true").lower() in ("1", "true", "yes")
+QDRANT_QUANTIZATION_OVERSAMPLING = float(os.getenv("QDRANT_QUANTIZATION_OVERSAMPLING", "2.0"))
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+
+class CollectionOptions:
+    """Options de stockage d'une collection : quantization, vecteurs sur disque et paramètres HNSW"""
+
+    def __init__(
+        self,
+        quantization: str = QDRANT_QUANTIZATION,
+        on_disk: bool = QDRANT_ON_DISK,
+        hnsw_m: int = QDRANT_HNSW_M,
+        hnsw_ef_construct: int = QDRANT_HNSW_EF_CONSTRUCT
+    ):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Quantization inconnue: {quantization} (attendu: {', '.join(QUANTIZATION_MODES)})")
+        self.quantization = quantization
+        self.on_disk = on_disk
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        """
+        Configuration de quantization des vecteurs denses. Les vecteurs quantifiés restent en RAM,
+        les vecteurs originaux (éventuellement sur disque) servent au rescoring.
+        """
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def dense_vector_params(self, size: int) -> models.VectorParams:
+        """Paramètres du vecteur dense "dense" """
+        return models.VectorParams(
+            size=size,
+            distance=models.Distance.COSINE,
+            on_disk=self.on_disk,
+            hnsw_config=models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.on_disk),
+            quantization_config=self.quantization_config()
+        )
+
+    def sparse_vector_params(self) -> models.SparseVectorParams:
+        """Paramètres du vecteur creux "sparse" """
+        return models.SparseVectorParams(index=models.SparseIndexParams(on_disk=self.on_disk))
+
+    def __repr__(self) -> str:
+        return (f"CollectionOptions(quantization={self.quantization}, on_disk={self.on_disk}, "
+                f"m={self.hnsw_m}, ef_construct={self.hnsw_ef_construct})")
+
+
+def build_search_params(
+    hnsw_ef: int = QDRANT_HNSW_EF,
+    rescore: bool = QDRANT_QUANTIZATION_RESCORE,
+    oversampling: float = QDRANT_QUANTIZATION_OVERSAMPLING,
+    exact: bool = False
+) -> models.SearchParams:
+    """
+    Paramètres de recherche : ef du graphe HNSW et, pour les collections quantifiées,
+    sur-échantillonnage des candidats puis rescoring avec les vecteurs originaux.
+    Sans effet sur la quantization pour une collection non quantifiée.
+    """
+    return models.SearchParams(
+        hnsw_ef=hnsw_ef or None,
+        exact=exact,
+        quantization=models.QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+    )
@@ -0,0 +1,63 @@
+import os
+import json
+import uuid
+import threading
+from datetime import datetime
+from typing import Optional
+
+
+# Fichier où les indexeurs enregistrent la version de chaque collection
+COLLECTION_VERSIONS_PATH = "./qdrant_versions.json"
+
+_lock = threading.Lock()
+_cached_mtime: Optional[float] = None
+_cached_versions: dict = {}
+
+
+def _read_versions() -> dict:
+    """Lit le fichier des versions, relu uniquement si sa date de modification a changé"""
+    global _cached_mtime, _cached_versions
+
+    try:
+        mtime = os.path.getmtime(COLLECTION_VERSIONS_PATH)
+    except OSError:
+        return {}
+
+    with _lock:
+        if mtime != _cached_mtime:
+            try:
+                with open(COLLECTION_VERSIONS_PATH, 'r', encoding='utf-8') as file:
+                    _cached_versions = json.load(file)
+            except (OSError, ValueError):
+                _cached_versions = {}
+            _cached_mtime = mtime
+        return _cached_versions
+
+
+def get_collection_version(collection_name: str) -> str:
+    """
+    Retourne la version courante d'une collection (vide si elle n'a jamais été enregistrée).
+    """
+    return _read_versions().get(collection_name, {}).get("version", "")
+
+
+def write_collection_version(collection_name: str) -> str:
+    """
+    Enregistre une nouvelle version pour une collection après sa (ré)indexation.
+    Les caches de résultats associés à l'ancienne version sont ainsi invalidés.
+    """
+    version = uuid.uuid4().hex
+    versions = dict(_read_versions())
+    versions[collection_name] = {
+        "version": version,
+        "indexed_at": datetime.now().isoformat(),
+    }
+
+    # Écriture atomique pour ne jamais exposer un fichier partiel au service
+    tmp_path = f"{COLLECTION_VERSIONS_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(versions, file, indent=2)
+    os.replace(tmp_path, COLLECTION_VERSIONS_PATH)
+
+    print(f"🏷️ Collection '{collection_name}' version {version}")
+    return version
@@ -101,13 +101,86 @@ def check_if_article_asked(user_message: str) -> bool:
 
 # Créer le dictionnaire
 numbers_dict = create_number_dict()
+MAX_NUMBER = max(numbers_dict.values())
+
+# Découpage en mots : les tirets et espaces séparent les mots des nombres ("quatre-vingt-dix")
+TOKEN_PATTERN = re.compile(r"\w+")
+_END_OF_NUMBER = None  # Clé du trie portant la valeur du nombre complet
+TOKEN_ALIASES = {"vingts": "vingt", "cents": "cent"}  # Pluriels ("quatre-vingts", "deux cents")
+
+
+def create_number_trie(number_dict):
+    """
+    Compile le vocabulaire des nombres en un trie de mots.
+    Ex: "quatre-vingt-dix" -> {"quatre": {"vingt": {"dix": {None: 90}}}}
+    """
+    trie = {}
+    for word_key, number_value in number_dict.items():
+        node = trie
+        for token in TOKEN_PATTERN.findall(word_key):
+            node = node.setdefault(token, {})
+        node[_END_OF_NUMBER] = number_value
+    return trie
+
+# Créer le trie une seule fois au chargement du module
+numbers_trie = create_number_trie(numbers_dict)
+
 
 def find_numbers_in_string(input_string):
     """
-    Parcourt le dictionnaire pour trouver des nombres (clés et valeurs) dans la chaîne d'entrée.
+    Parcourt la chaîne d'entrée en un seul passage pour trouver des nombres (en lettres et en chiffres).
+    Les nombres en lettres sont reconnus via le trie en gardant la correspondance la plus longue.
     Retourne une liste avec tous les nombres trouvés.
     """
 
+    if not check_if_article_asked(input_string):
+        return []
+
+    tokens = [TOKEN_ALIASES.get(token, token) for token in TOKEN_PATTERN.findall(input_string.lower())]
+    found_numbers : list[str] = []
+    seen = set()
+
+    def add_number(number):
+        number = str(number)
+        if number not in seen:
+            seen.add(number)
+            found_numbers.append(number)
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+
+        # Nombres en chiffres : simple vérification de plage
+        if token.isdigit():
+            if 1 <= int(token) <= MAX_NUMBER:
+                add_number(int(token))
+            i += 1
+            continue
+
+        # Nombres en lettres : correspondance la plus longue dans le trie
+        node = numbers_trie
+        match_value, match_end = None, i
+        j = i
+        while j < len(tokens) and tokens[j] in node:
+            node = node[tokens[j]]
+            j += 1
+            if _END_OF_NUMBER in node:
+                match_value, match_end = node[_END_OF_NUMBER], j
+
+        if match_value is not None:
+            add_number(match_value)
+            i = match_end
+        else:
+            i += 1
+
+    return found_numbers
+
+
+def _find_numbers_in_string_naive(input_string):
+    """
+    Ancienne implémentation (recherche de chaque clé du dictionnaire), conservée pour le benchmark.
+    """
+
     if not check_if_article_asked(input_string):
         return []
 
@@ -159,6 +232,17 @@ def find_numbers_in_string(input_string):
 
 
 
+def benchmark(test_strings, iterations=200):
+    """Compare le temps d'exécution du trie et de l'ancienne implémentation."""
+    for name, function in (("naïf", _find_numbers_in_string_naive), ("trie", find_numbers_in_string)):
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            for test_string in test_strings:
+                function(test_string)
+        elapsed = time.perf_counter() - start_time
+        print(f"{name:>5}: {elapsed / (iterations * len(test_strings)) * 1e6:.1f} µs par chaîne")
+
+
 if __name__ == "__main__":
     
     start_time = time.time()
@@ -188,4 +272,7 @@ if __name__ == "__main__":
     end_time = time.time()
     execution_time = end_time - start_time
     
-    print(f"Temps d'exécution: {execution_time:.6f} secondes")
\ No newline at end of file
+    print(f"Temps d'exécution: {execution_time:.6f} secondes")
+
+    print("\n=== Benchmark ===")
+    benchmark([test_string, test_string2, test_string3])
@@ -0,0 +1,180 @@
+import time
+import argparse
+from typing import Dict, List
+import numpy as np
+from qdrant_client import QdrantClient
+from EmbeddingBackend import SentenceTransformerEmbeddings, DEFAULT_EMBEDDED_MODEL, ONNX_QUANTIZATIONS
+from collection_config import build_search_params
+from qdrant_backend import get_qdrant_client
+
+
+# Configuration
+DEFAULT_COLLECTION = "code-civil-2"
+QUERY_WORDS = 25  # Longueur des requêtes tirées du corpus (début des chunks)
+SAMPLE_QUESTIONS = [
+    "Quelles sont les conditions de validité d'un contrat ?",
+    "Comment se transmet la succession en l'absence de testament ?",
+    "Quels sont les effets du divorce par consentement mutuel ?",
+    "Qui est responsable du dommage causé par un animal ?",
+    "Quelle est la durée de la prescription de droit commun ?",
+    "Comment prouver l'existence d'une obligation ?",
+    "Quels sont les droits et devoirs respectifs des époux ?",
+    "À quelles conditions peut-on adopter un enfant ?",
+]
+
+
+def load_texts(client: QdrantClient, collection_name: str, limit: int) -> List[str]:
+    """Lit le texte des chunks d'une collection (corpus réel)"""
+    texts = []
+    offset = None
+    while len(texts) < limit:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=min(256, limit - len(texts)),
+            offset=offset,
+            with_payload=["page_content"],
+            with_vectors=False
+        )
+        texts.extend(point.payload["page_content"] for point in points if point.payload.get("page_content"))
+        if offset is None:
+            break
+    return texts
+
+
+def make_queries(texts: List[str], count: int, seed: int = 0) -> List[str]:
+    """Questions types et débuts de chunks tirés au hasard, pour des requêtes de longueur réaliste"""
+    rng = np.random.default_rng(seed)
+    sampled = [texts[i] for i in rng.choice(len(texts), size=min(count, len(texts)), replace=False)]
+    return SAMPLE_QUESTIONS + [" ".join(text.split()[:QUERY_WORDS]) for text in sampled]
+
+
+def measure(embeddings: SentenceTransformerEmbeddings, queries: List[str], texts: List[str], batch_size: int) -> Dict:
+    """Latence d'une requête seule (p50/p95) et débit d'encodage par lots"""
+    embeddings.embed_query(queries[0])  # Préchauffage
+    latencies = []
+    query_vectors = []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    document_vectors = embeddings.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return {
+        "p50_ms": np.percentile(latencies, 50),
+        "p95_ms": np.percentile(latencies, 95),
+        "throughput": len(texts) / elapsed if elapsed else 0.0,
+        "query_vectors": np.asarray(query_vectors, dtype=np.float32),
+        "document_vectors": document_vectors,
+    }
+
+
+def top_ids(client: QdrantClient, collection_name: str, vectors: np.ndarray, k: int) -> List[List]:
+    """k plus proches chunks de chaque vecteur dans la collection (vecteurs denses indexés)"""
+    return [
+        [point.id for point in client.query_points(
+            collection_name=collection_name,
+            query=vector.tolist(),
+            using="dense",
+            limit=k,
+            search_params=build_search_params(),
+            with_payload=False
+        ).points]
+        for vector in vectors
+    ]
+
+
+def agreement_at_k(results: List[List], reference: List[List]) -> float:
+    """Part des k résultats de référence (PyTorch) retrouvés"""
+    found = sum(len(set(result) & set(expected)) for result, expected in zip(results, reference))
+    return found / max(sum(len(expected) for expected in reference), 1)
+
+
+def benchmark(
+    client: QdrantClient,
+    collection_name: str,
+    model_name: str,
+    queries: List[str],
+    texts: List[str],
+    quantizations: List[str],
+    threads: int = 0,
+    k: int = 10,
+    batch_size: int = 32
+) -> List[Dict]:
+    """
+    Compare le backend PyTorch (référence, celui qui a indexé la collection) aux backends
+    ONNX Runtime : latence, débit, similarité cosinus des vecteurs et accord des k premiers
+    résultats de recherche dans la collection.
+    """
+    print(f"🔧 Référence PyTorch ({model_name})...")
+    reference_model = SentenceTransformerEmbeddings(model_name, device="cpu", backend="torch")
+    reference = measure(reference_model, queries, texts, batch_size)
+    reference_ids = top_ids(client, collection_name, reference["query_vectors"], k)
+    rows = [{"config": "torch", **reference, "cosine_mean": 1.0, "cosine_min": 1.0, "agreement": 1.0}]
+    del reference_model
+
+    for quantization in quantizations:
+        print(f"🔧 ONNX Runtime (quantization {quantization})...")
+        onnx_model = SentenceTransformerEmbeddings(
+            model_name, backend="onnx", onnx_quantization=quantization, onnx_threads=threads
+        )
+        result = measure(onnx_model, queries, texts, batch_size)
+        # Vecteurs normalisés : le produit scalaire est la similarité cosinus
+        cosines = np.concatenate([
+            np.sum(result["query_vectors"] * reference["query_vectors"], axis=1),
+            np.sum(result["document_vectors"] * reference["document_vectors"], axis=1)
+        ])
+        rows.append({
+            "config": f"onnx {quantization}",
+            **result,
+            "cosine_mean": float(cosines.mean()),
+            "cosine_min": float(cosines.min()),
+            "agreement": agreement_at_k(top_ids(client, collection_name, result["query_vectors"], k), reference_ids)
+        })
+        del onnx_model
+
+    print(f"\n{len(queries)} requêtes, {len(texts)} chunks de '{collection_name}', k={k}, "
+          f"threads ONNX: {threads or 'tous'}")
+    print(f"{'Backend':<18} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | {'Chunks/s':>8} | "
+          f"{'Cosinus moy.':>12} | {'Cosinus min':>11} | {f'Accord@{k}':>9}")
+    for row in rows:
+        print(f"{row['config']:<18} | {row['p50_ms']:>8.1f} | {row['p95_ms']:>8.1f} | {row['throughput']:>8.1f} | "
+              f"{row['cosine_mean']:>12.4f} | {row['cosine_min']:>11.4f} | {row['agreement']:>9.3f}")
+    return rows
+
+
+def main():
+    """Compare les backends PyTorch et ONNX Runtime du modèle d'embedding sur une collection indexée"""
+    parser = argparse.ArgumentParser(description="Latence, débit et accord des backends d'embedding")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDED_MODEL, help="Modèle ayant indexé la collection")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION, help="Collection servant de corpus et de référence")
+    parser.add_argument("--queries", type=int, default=100, help="Nombre de requêtes tirées du corpus")
+    parser.add_argument("--limit", type=int, default=512, help="Nombre de chunks encodés pour mesurer le débit")
+    parser.add_argument("--k", type=int, default=10, help="Nombre de résultats comparés par requête")
+    parser.add_argument("--batch-size", type=int, default=32, help="Taille des lots pour la mesure du débit")
+    parser.add_argument("--threads", type=int, default=0, help="Threads ONNX Runtime (0 = tous les cœurs)")
+    parser.add_argument("--quantization", nargs="+", default=["none", "avx2"], choices=ONNX_QUANTIZATIONS,
+                        help="Variantes ONNX comparées")
+    args = parser.parse_args()
+
+    client = get_qdrant_client()
+    texts = load_texts(client, args.collection, args.limit)
+    if not texts:
+        raise SystemExit(f"Aucun chunk dans la collection '{args.collection}' (indexer d'abord le code)")
+
+    benchmark(
+        client,
+        args.collection,
+        args.model,
+        make_queries(texts, args.queries),
+        texts,
+        args.quantization,
+        threads=args.threads,
+        k=args.k,
+        batch_size=args.batch_size
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import uuid
+import hashlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointIdsList, SetPayload, SetPayloadOperation
+
+
+# Espace de noms des identifiants de points dérivés du contenu
+POINT_ID_NAMESPACE = uuid.UUID("5b0c6f0e-8f3c-4a59-9d2b-6c1c0de2c1f1")
+
+# Métadonnées qui dépendent de la position du chunk et non de son contenu
+VOLATILE_METADATA_KEYS = {"chunk_id", "start_index"}
+
+DELETE_BATCH_SIZE = 1000
+SCROLL_BATCH_SIZE = 1000
+POSITION_UPDATE_BATCH_SIZE = 500
+
+
+def content_hash(text: str, metadata: Dict) -> str:
+    """
+    Calcule l'empreinte d'un chunk (texte + métadonnées stables).
+    Un chunk inchangé garde la même empreinte d'une indexation à l'autre.
+    """
+    stable_metadata = {key: value for key, value in metadata.items() if key not in VOLATILE_METADATA_KEYS}
+    payload = json.dumps({"text": text, "metadata": stable_metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def point_id(chunk_hash: str) -> str:
+    """Identifiant de point Qdrant déterministe dérivé de l'empreinte du chunk"""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, chunk_hash))
+
+
+def get_existing_point_ids(client: QdrantClient, collection_name: str) -> Set[Union[int, str]]:
+    """
+    Récupère les identifiants des points déjà indexés : c'est le manifeste de la collection,
+    puisque chaque identifiant est dérivé de l'empreinte du contenu.
+    """
+    if not client.collection_exists(collection_name):
+        return set()
+
+    existing_ids = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=SCROLL_BATCH_SIZE,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False
+        )
+        existing_ids.update(point.id for point in points)
+        if offset is None:
+            break
+    return existing_ids
+
+
+def get_existing_chunk_positions(client: QdrantClient, collection_name: str) -> Dict[Union[int, str], Optional[int]]:
+    """
+    Récupère les identifiants des points déjà indexés avec leur position (metadata.chunk_id),
+    pour mettre à jour la position des chunks inchangés qui ont été décalés.
+    """
+    if not client.collection_exists(collection_name):
+        return {}
+
+    positions = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=SCROLL_BATCH_SIZE,
+            offset=offset,
+            with_payload=["metadata.chunk_id"],
+            with_vectors=False
+        )
+        for point in points:
+            positions[point.id] = (point.payload or {}).get("metadata", {}).get("chunk_id")
+        if offset is None:
+            break
+    return positions
+
+
+class IncrementalPlan:
+    """
+    Compare au fil de l'eau les chunks à indexer avec le manifeste de la collection,
+    sans avoir besoin de tous les chunks en mémoire.
+    """
+
+    def __init__(self, existing_ids: Set[Union[int, str]], existing_positions: Optional[Dict[Union[int, str], Optional[int]]] = None):
+        """
+        :param existing_ids: Identifiants des points déjà présents
+        :param existing_positions: Position (chunk_id) des points déjà présents, pour repérer les chunks décalés
+        """
+        self._existing_ids = existing_ids
+        self._existing_positions = existing_positions or {}
+        self._wanted_ids: Set[str] = set()
+        self.moved: Dict[str, int] = {}  # Chunks inchangés dont la position a changé
+
+    def point_to_index(self, chunk_hash: str, position: Optional[int] = None) -> Optional[str]:
+        """
+        :param position: Position du chunk dans le texte (chunk_id)
+        :return: Identifiant du point à insérer, ou None si le chunk est déjà indexé (ou dupliqué)
+        """
+        chunk_point_id = point_id(chunk_hash)
+        if chunk_point_id in self._wanted_ids:
+            return None  # Chunk dupliqué
+        self._wanted_ids.add(chunk_point_id)
+        if chunk_point_id not in self._existing_ids:
+            return chunk_point_id
+        if position is not None and self._existing_positions.get(chunk_point_id, position) != position:
+            self.moved[chunk_point_id] = position
+        return None
+
+    @property
+    def kept_count(self) -> int:
+        return len(self._wanted_ids)
+
+    def stale_ids(self) -> List[Union[int, str]]:
+        """Identifiants des points qui ne correspondent plus à aucun chunk"""
+        return list(self._existing_ids - self._wanted_ids)
+
+
+def plan_incremental_update(existing_ids: Set[Union[int, str]], chunk_hashes: Iterable[str]) -> Tuple[List[int], List[Union[int, str]]]:
+    """
+    Compare les chunks à indexer avec le manifeste de la collection.
+
+    :param existing_ids: Identifiants des points déjà présents
+    :param chunk_hashes: Empreintes des chunks, dans l'ordre
+    :return: (indices des chunks à embedder et insérer, identifiants des points à supprimer)
+    """
+    plan = IncrementalPlan(existing_ids)
+    to_index = [i for i, chunk_hash in enumerate(chunk_hashes) if plan.point_to_index(chunk_hash) is not None]
+    return to_index, plan.stale_ids()
+
+
+def delete_points(client: QdrantClient, collection_name: str, point_ids: List[Union[int, str]]):
+    """Supprime par lots les points qui ne correspondent plus à aucun chunk"""
+    for i in range(0, len(point_ids), DELETE_BATCH_SIZE):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=point_ids[i:i + DELETE_BATCH_SIZE])
+        )
+
+
+def update_chunk_positions(client: QdrantClient, collection_name: str, positions: Dict[Union[int, str], int]):
+    """Réécrit le chunk_id des points inchangés décalés par l'ajout ou la suppression d'autres chunks"""
+    updates = list(positions.items())
+    for i in range(0, len(updates), POSITION_UPDATE_BATCH_SIZE):
+        client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                SetPayloadOperation(set_payload=SetPayload(payload={"chunk_id": position}, points=[chunk_point_id], key="metadata"))
+                for chunk_point_id, position in updates[i:i + POSITION_UPDATE_BATCH_SIZE]
+            ]
+        )
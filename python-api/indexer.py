@@ -1,65 +1,81 @@
 import os
 import re
+import time
+import argparse
+import resource
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_right
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Optional, Iterator
 from dotenv import load_dotenv
+import numpy as np
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.schema import Document
 
 from qdrant_client import QdrantClient, models
-from qdrant_client.models import Distance, VectorParams, PointStruct, SparseVectorParams
-from sentence_transformers import SentenceTransformer
+
+from qdrant_backend import get_qdrant_client
+
+from EmbeddingBackend import SentenceTransformerEmbeddings, get_embedding_backend
+from collection_config import CollectionOptions, build_search_params
+from ArticleStore import ARTICLE_HEADING_PATTERN, normalize_article_number
+from query_filters import normalize_division_number, ensure_payload_indexes
+
+from collection_version import write_collection_version
+from incremental_index import content_hash, get_existing_chunk_positions, IncrementalPlan, delete_points, update_chunk_positions
 
 # Charger les variables d'environnement
 load_dotenv()
 
+# Ligne de titre de structure (ex: "Livre Ier : Des personnes"), distincte d'une ligne de texte
+# commençant par "titre" ou "livre"
+HEADING_LINE_PATTERN = re.compile(r"^\s*(Livre|Titre|Chapitre|Section|Sous-section)\s[^\n]*:")
+
+def peak_memory_mb() -> float:
+    """Pic de mémoire résidente du processus (Mo)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
 class CodeCivilIndexer:
-    def __init__(self):
+    def __init__(self, embeddings: Optional[SentenceTransformerEmbeddings] = None,
+                 collection_options: Optional[CollectionOptions] = None):
         """
         Initialise l'indexer pour le Code Civil
+        
+        Args:
+            embeddings: Modèle d'embedding partagé (chargé une seule fois par processus si absent)
+            collection_options: Quantization et paramètres HNSW de la collection (vecteurs sur disque par défaut)
         """
         self.embedded_model_name = os.getenv("EMBEDDED_MODEL", "BAAI/bge-m3")
         self.collection_name = "code-civil"
         self.vector_size = None  # Sera déterminé automatiquement
         self.chunk_size_words = 520
         self.chunk_overlap_words = 50
+        self.embed_batch_size = int(os.getenv("INDEX_EMBED_BATCH_SIZE", "64"))  # Chunks encodés par lot
+        self.upsert_batch_size = int(os.getenv("INDEX_UPSERT_BATCH_SIZE", "100"))  # Points envoyés par requête
+        self.max_pending_writes = 2  # Lots encodés en attente d'écriture dans Qdrant
+        self.collection_options = collection_options or CollectionOptions(on_disk=True)
         
         # Configuration des chemins
         self.documents_path = Path(__file__).parent / "documents"
         self.code_civil_path = self.documents_path / "code-civil.txt"
         
-        # Initialiser le client Qdrant avec le serveur distant
-        # self.qdrant_client = QdrantClient(url="http://localhost:6333")
-        
-        # Alternative pour connexion locale (décommentez si nécessaire)
-        self.qdrant_client = QdrantClient(path="./qdrant_db")
+        # Client Qdrant partagé : serveur si QDRANT_URL est défini, base locale sinon
+        self.qdrant_client: QdrantClient = get_qdrant_client()
         
-        # Initialiser le modèle d'embedding avec CPU
-        self.embedding_model = HuggingFaceEmbeddings(
-            model_name=self.embedded_model_name,
-            #model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True, 'show_progress_bar': True}
-        )
-        
-        # Initialiser SentenceTransformer pour la normalisation
-        self.sentence_transformer = SentenceTransformer(
-            self.embedded_model_name, 
-            device='cpu'
-        )
+        # Modèle d'embedding unique (vecteurs normalisés pour la distance cosine)
+        self.embedding_model = embeddings or get_embedding_backend(self.embedded_model_name)
         
         # Déterminer automatiquement la taille des vecteurs
         self._determine_vector_size()
         
     def _determine_vector_size(self):
         """
-        Détermine automatiquement la taille des vecteurs du modèle
+        Détermine automatiquement la taille des vecteurs à partir de la configuration du modèle
         """
         print("Détermination de la taille des vecteurs...")
-        test_text = "Test pour déterminer la dimension des vecteurs."
-        test_embedding = self.sentence_transformer.encode([test_text], normalize_embeddings=True)
-        self.vector_size = len(test_embedding[0])
+        self.vector_size = self.embedding_model.dimension
         print(f"Taille des vecteurs détectée: {self.vector_size} dimensions")
         
     def _count_words(self, text: str) -> int:
@@ -81,116 +97,68 @@ class CodeCivilIndexer:
                 self.qdrant_client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config={
-                        "dense": VectorParams(
-                            size=self.vector_size,
-                            distance=Distance.COSINE,
-                            on_disk=True,                          # vecteurs denses sur disque
-                            hnsw_config=models.HnswConfigDiff(on_disk=True)  # index HNSW sur disque
-                        )
+                        "dense": self.collection_options.dense_vector_params(self.vector_size)
                     },
                     sparse_vectors_config={
-                        "sparse": SparseVectorParams(
-                            index=models.SparseIndexParams(on_disk=True)    # vecteurs creux sur disque
-                        )
+                        "sparse": self.collection_options.sparse_vector_params()
                     }
                 )
                 print(f"Collection '{self.collection_name}' créée avec succès.")
             else:
                 print(f"La collection '{self.collection_name}' existe déjà.")
+            
+            # Index sur les numéros d'articles, de livres et de titres : une recherche par article devient un simple filtre
+            ensure_payload_indexes(self.qdrant_client, self.collection_name)
                 
         except Exception as e:
             print(f"Erreur lors de la création de la collection: {e}")
             raise
     
-    def _extract_structure_metadata(self, text: str, position: int) -> Dict[str, str]:
+    def _build_structure_outline(self, text: str) -> Dict[str, Tuple[List[int], List[Tuple[str, str]]]]:
         """
-        Extrait les métadonnées de structure (Livre, Titre, Chapitre, etc.) pour une position donnée
+        Construit en un seul passage le plan du texte : pour chaque niveau hiérarchique,
+        la liste triée des positions des titres et leurs (numéro, intitulé)
         """
-        # Rechercher en arrière pour trouver la structure hiérarchique
-        text_before = text[:position]
-        
         # Patterns pour extraire la structure
-        livre_pattern = r'Livre\s+([IVXLCDM]+)\s*:\s*(.+?)(?=\n|$)'
-        titre_pattern = r'Titre\s+([IVXLCDM]+|préliminaire)\s*:\s*(.+?)(?=\n|$)'
-        chapitre_pattern = r'Chapitre\s+([IVXLCDM]+)\s*:\s*(.+?)(?=\n|$)'
-        section_pattern = r'Section\s+([IVXLCDM]+)\s*:\s*(.+?)(?=\n|$)'
-        sous_section_pattern = r'Sous-section\s+([IVXLCDM]+)\s*:\s*(.+?)(?=\n|$)'
-        
-        # Chercher les dernières occurrences de chaque niveau hiérarchique
-        livre_match = None
-        for match in re.finditer(livre_pattern, text_before, re.IGNORECASE):
-            livre_match = match
-            
-        titre_match = None
-        for match in re.finditer(titre_pattern, text_before, re.IGNORECASE):
-            titre_match = match
-            
-        chapitre_match = None
-        for match in re.finditer(chapitre_pattern, text_before, re.IGNORECASE):
-            chapitre_match = match
-            
-        section_match = None
-        for match in re.finditer(section_pattern, text_before, re.IGNORECASE):
-            section_match = match
-            
-        sous_section_match = None
-        for match in re.finditer(sous_section_pattern, text_before, re.IGNORECASE):
-            sous_section_match = match
-        
-        # Construire les métadonnées
-        metadata = {}
-        
-        if livre_match:
-            metadata["livre_numero"] = livre_match.group(1).strip()
-            metadata["livre_titre"] = livre_match.group(2).strip()
-            
-        if titre_match:
-            metadata["titre_numero"] = titre_match.group(1).strip()
-            metadata["titre_titre"] = titre_match.group(2).strip()
-            
-        if chapitre_match:
-            metadata["chapitre_numero"] = chapitre_match.group(1).strip()
-            metadata["chapitre_titre"] = chapitre_match.group(2).strip()
-            
-        if section_match:
-            metadata["section_numero"] = section_match.group(1).strip()
-            metadata["section_titre"] = section_match.group(2).strip()
-            
-        if sous_section_match:
-            metadata["sous_section_numero"] = sous_section_match.group(1).strip()
-            metadata["sous_section_titre"] = sous_section_match.group(2).strip()
-        
-        return metadata
+        patterns = {
+            "livre": r'Livre\s+([IVXLCDM]+(?:er)?(?:\s+(?:bis|ter|quater))?)\s*:\s*(.+?)(?=\n|$)',
+            "titre": r'Titre\s+([IVXLCDM]+(?:er)?(?:\s+(?:bis|ter|quater))?|préliminaire)\s*:\s*(.+?)(?=\n|$)',
+            "chapitre": r'Chapitre\s+([IVXLCDM]+)\s*:\s*(.+?)(?=\n|$)',
+            "section": r'Section\s+([IVXLCDM]+)\s*:\s*(.+?)(?=\n|$)',
+            "sous_section": r'Sous-section\s+([IVXLCDM]+)\s*:\s*(.+?)(?=\n|$)',
+        }
+        
+        outline = {}
+        for level, pattern in patterns.items():
+            positions = []
+            headings = []
+            for match in re.finditer(pattern, text, re.IGNORECASE):
+                numero = match.group(1).strip()
+                if level in ("livre", "titre"):
+                    # Numéro normalisé comme dans les filtres de recherche (ex: "Ier" -> "1", "IV bis" -> "4bis")
+                    numero = normalize_division_number(numero) or ""
+                positions.append(match.start())
+                headings.append((numero, match.group(2).strip()))
+            outline[level] = (positions, headings)
+        
+        return outline
     
-    def _extract_article_number(self, text: str) -> str:
-        """
-        Extrait le numéro d'article du début du texte (pour compatibilité)
+    def _extract_structure_metadata(self, outline: Dict[str, Tuple[List[int], List[Tuple[str, str]]]], position: int) -> Dict[str, str]:
         """
-        # Pattern pour capturer les numéros d'articles (y compris avec tirets comme 6-1)
-        article_pattern = r'^Article\s+(\d+(?:-\d+)*)'
-        match = re.search(article_pattern, text.strip(), re.IGNORECASE)
-        
-        if match:
-            return match.group(1)
-        return ""
-    
-    def _extract_all_articles(self, text: str) -> List[str]:
-        """
-        Extrait tous les numéros d'articles présents dans le texte
+        Extrait les métadonnées de structure (Livre, Titre, Chapitre, etc.) pour une position donnée
+        par recherche dichotomique dans le plan du texte
         """
-        # Pattern pour capturer tous les numéros d'articles dans le texte
-        article_pattern = r'Article\s+(\d+(?:-\d+)*)'
-        matches = re.findall(article_pattern, text, re.IGNORECASE)
+        metadata = {}
         
-        # Supprimer les doublons tout en préservant l'ordre
-        seen = set()
-        unique_articles = []
-        for article in matches:
-            if article not in seen:
-                seen.add(article)
-                unique_articles.append(article)
+        # Dernier titre de chaque niveau situé avant la position
+        for level, (positions, headings) in outline.items():
+            index = bisect_right(positions, position) - 1
+            if index >= 0:
+                numero, titre = headings[index]
+                metadata[f"{level}_numero"] = numero
+                metadata[f"{level}_titre"] = titre
         
-        return unique_articles
+        return metadata
     
     def _load_and_preprocess_text(self) -> str:
         """
@@ -212,236 +180,202 @@ class CodeCivilIndexer:
         print(f"Texte chargé: {len(content)} caractères, {self._count_words(content)} mots")
         return content
     
-    def _create_chunks(self, text: str) -> List[Document]:
+    def _iter_units(self, text: str) -> Iterator[Tuple[int, int, Optional[str], int]]:
+        """
+        Découpe le texte en unités insécables : un article précédé des titres de structure
+        qui l'introduisent. Le texte qui précède le premier article est rattaché à l'unité
+        de cet article, celui qui suit le dernier article à l'unité du dernier ; un texte
+        sans aucun article forme une seule unité sans numéro.
+        
+        Returns:
+            Itérateur de (début, fin, numéro d'article ou None, début de l'article)
+        """
+        unit_start = 0
+        article_number, article_start = None, 0
+        heading_start = None  # Début des titres lus depuis le dernier article
+        
+        position = 0
+        for line in text.splitlines(keepends=True):
+            article_match = ARTICLE_HEADING_PATTERN.match(line)
+            if heading_start is None and (article_match or HEADING_LINE_PATTERN.match(line)):
+                heading_start = position
+            if article_match:
+                # Un nouvel article ferme l'unité en cours : les titres qui le précèdent lui reviennent
+                if article_number is not None:
+                    yield unit_start, heading_start, article_number, article_start
+                    unit_start = heading_start
+                article_number = normalize_article_number(article_match.group(1))
+                article_start = position
+                heading_start = None
+            position += len(line)
+        
+        if unit_start < len(text):
+            yield unit_start, len(text), article_number, article_start
+    
+    def _build_chunk(self, text: str, start: int, end: int, articles: List[Tuple[str, int, int]],
+                     outline: Dict[str, Tuple[List[int], List[Tuple[str, str]]]], chunk_id: int) -> Document:
         """
-        Découpe le texte en chunks de 520 mots avec recouvrement et métadonnées enrichies
+        Crée le document d'un chunk text[start:end] avec ses métadonnées enrichies
+        
+        Args:
+            articles: (numéro, début, fin) des articles du chunk, en positions absolues dans le texte
+        """
+        chunk_text = text[start:end]
+        all_articles = list(dict.fromkeys(number for number, _, _ in articles))
+        # Les titres de structure en tête du chunk précèdent son premier article : la structure
+        # est lue à la position de cet article, pas au début du chunk
+        structure_position = articles[0][1] if articles else start
+        
+        metadata = {
+            "source": "code-civil.txt",
+            "chunk_id": chunk_id,
+            "word_count": self._count_words(chunk_text),
+            "article_number": all_articles[0] if all_articles else "",
+            "all_articles": all_articles,
+            "articles_count": len(all_articles),
+            # Position exacte de chaque article dans le texte du chunk
+            "article_offsets": [
+                {"article": number, "start": article_start - start, "end": article_end - start}
+                for number, article_start, article_end in articles
+            ],
+            "has_article": bool(all_articles),
+            **self._extract_structure_metadata(outline, structure_position)
+        }
+        if len(all_articles) == 1:
+            metadata["article_text"] = f"Article {all_articles[0]}"
+        elif all_articles:
+            metadata["article_text"] = f"Articles {', '.join(all_articles)}"
+        
+        return Document(page_content=chunk_text, metadata=metadata)
+    
+    def _iter_chunks(self, text: str) -> Iterator[Document]:
+        """
+        Découpe le texte en chunks d'au plus 520 mots sans jamais couper un article,
+        sauf s'il dépasse à lui seul cette limite (il est alors découpé par mots avec recouvrement).
+        Les chunks sont produits un à un pour ne pas matérialiser tout le corpus découpé.
         """
         print("Découpage du texte en chunks avec extraction des métadonnées...")
         
-        # Estimation de la taille en caractères (moyenne 5 caractères par mot)
-        chunk_size_chars = self.chunk_size_words * 5
-        chunk_overlap_chars = self.chunk_overlap_words * 5
-        
-        # Utiliser RecursiveCharacterTextSplitter pour un découpage intelligent
-        # Prioriser la séparation aux articles
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size_chars,
-            chunk_overlap=chunk_overlap_chars,
-            length_function=len,
-            separators=["\n\nArticle ", "\n\nLivre ", "\n\nTitre ", "\n\nChapitre ", "\n\n", "\n", ". ", " ", ""]
-        )
+        # Plan hiérarchique construit une seule fois pour tout le texte
+        outline = self._build_structure_outline(text)
         
-        # Créer des documents
-        documents = text_splitter.create_documents([text])
+        chunk_count = 0
+        chunk_start, chunk_end, chunk_words = None, 0, 0
+        chunk_articles: List[Tuple[str, int, int]] = []
         
-        # Filtrer et ajuster les chunks pour respecter la limite de mots et ajouter les métadonnées
-        filtered_docs = []
-        for i, doc in enumerate(documents):
-            word_count = self._count_words(doc.page_content)
+        for unit_start, unit_end, article_number, article_start in self._iter_units(text):
+            # Ignorer les espaces de fin d'unité
+            unit_end = unit_start + len(text[unit_start:unit_end].rstrip())
+            if unit_end <= unit_start:
+                continue
+            unit_words = self._count_words(text[unit_start:unit_end])
             
-            # Trouver la position du chunk dans le texte original pour extraire les métadonnées
-            chunk_position = text.find(doc.page_content[:100])  # Utiliser les 100 premiers caractères
-            if chunk_position == -1:
-                chunk_position = 0
+            # Fermer le chunk en cours si l'unité ne tient pas dedans
+            if chunk_start is not None and chunk_words + unit_words > self.chunk_size_words:
+                yield self._build_chunk(text, chunk_start, chunk_end, chunk_articles, outline, chunk_count)
+                chunk_count += 1
+                chunk_start, chunk_words, chunk_articles = None, 0, []
             
-            # Extraire les métadonnées de structure
-            structure_metadata = self._extract_structure_metadata(text, chunk_position)
+            if unit_words > self.chunk_size_words:
+                # Article trop long à lui seul : découpage par mots avec recouvrement
+                word_spans = [match.span() for match in re.finditer(r'\S+', text[unit_start:unit_end])]
+                step = self.chunk_size_words - self.chunk_overlap_words
+                for first_word in range(0, len(word_spans) - self.chunk_overlap_words, step):
+                    last_word = min(first_word + self.chunk_size_words, len(word_spans)) - 1
+                    piece_start = unit_start + word_spans[first_word][0]
+                    piece_end = unit_start + word_spans[last_word][1]
+                    piece_articles = []
+                    if article_number is not None and article_start < piece_end:
+                        piece_articles.append((article_number, max(article_start, piece_start), piece_end))
+                    yield self._build_chunk(text, piece_start, piece_end, piece_articles, outline, chunk_count)
+                    chunk_count += 1
+                continue
             
-            # Extraire le numéro d'article si présent (pour compatibilité)
-            article_number = self._extract_article_number(doc.page_content)
-            
-            # Extraire tous les articles présents dans le chunk
-            all_articles = self._extract_all_articles(doc.page_content)
-            
-            if word_count > self.chunk_size_words:
-                # Si le chunk est trop long, le redécouper
-                words = doc.page_content.split()
-                while len(words) > self.chunk_size_words:
-                    chunk_words = words[:self.chunk_size_words]
-                    chunk_text = ' '.join(chunk_words)
-                    
-                    # Extraire le numéro d'article pour ce sous-chunk
-                    sub_article_number = self._extract_article_number(chunk_text)
-                    sub_all_articles = self._extract_all_articles(chunk_text)
-                    
-                    # Créer les métadonnées complètes
-                    metadata = {
-                        "source": "code-civil.txt",
-                        "chunk_id": len(filtered_docs),
-                        "word_count": len(chunk_words),
-                        "article_number": sub_article_number or article_number,
-                        "all_articles": sub_all_articles if sub_all_articles else all_articles,
-                        "articles_count": len(sub_all_articles) if sub_all_articles else len(all_articles),
-                        **structure_metadata
-                    }
-                    
-                    # Ajouter des métadonnées de contexte pour la recherche
-                    if sub_article_number or article_number or sub_all_articles or all_articles:
-                        metadata["has_article"] = True
-                        primary_article = sub_article_number or article_number
-                        if primary_article:
-                            metadata["article_text"] = f"Article {primary_article}"
-                        elif sub_all_articles:
-                            metadata["article_text"] = f"Articles {', '.join(sub_all_articles)}"
-                        elif all_articles:
-                            metadata["article_text"] = f"Articles {', '.join(all_articles)}"
-                    else:
-                        metadata["has_article"] = False
-                    
-                    filtered_docs.append(Document(
-                        page_content=chunk_text,
-                        metadata=metadata
-                    ))
-                    
-                    # Retirer les mots traités avec un recouvrement
-                    words = words[self.chunk_size_words - self.chunk_overlap_words:]
-                
-                # Traiter les mots restants s'il y en a
-                if words:
-                    chunk_text = ' '.join(words)
-                    if self._count_words(chunk_text) > 10:  # Minimum 10 mots
-                        sub_article_number = self._extract_article_number(chunk_text)
-                        sub_all_articles = self._extract_all_articles(chunk_text)
-                        
-                        metadata = {
-                            "source": "code-civil.txt",
-                            "chunk_id": len(filtered_docs),
-                            "word_count": len(words),
-                            "article_number": sub_article_number or article_number,
-                            "all_articles": sub_all_articles if sub_all_articles else all_articles,
-                            "articles_count": len(sub_all_articles) if sub_all_articles else len(all_articles),
-                            **structure_metadata
-                        }
-                        
-                        if sub_article_number or article_number or sub_all_articles or all_articles:
-                            metadata["has_article"] = True
-                            primary_article = sub_article_number or article_number
-                            if primary_article:
-                                metadata["article_text"] = f"Article {primary_article}"
-                            elif sub_all_articles:
-                                metadata["article_text"] = f"Articles {', '.join(sub_all_articles)}"
-                            elif all_articles:
-                                metadata["article_text"] = f"Articles {', '.join(all_articles)}"
-                        else:
-                            metadata["has_article"] = False
-                        
-                        filtered_docs.append(Document(
-                            page_content=chunk_text,
-                            metadata=metadata
-                        ))
-            else:
-                # Le chunk respecte la limite de mots
-                metadata = {
-                    "source": "code-civil.txt",
-                    "chunk_id": i,
-                    "word_count": word_count,
-                    "article_number": article_number,
-                    "all_articles": all_articles,
-                    "articles_count": len(all_articles),
-                    **structure_metadata
-                }
-                
-                # Ajouter des métadonnées de contexte
-                if article_number or all_articles:
-                    metadata["has_article"] = True
-                    if article_number:
-                        metadata["article_text"] = f"Article {article_number}"
-                    elif all_articles:
-                        metadata["article_text"] = f"Articles {', '.join(all_articles)}"
-                else:
-                    metadata["has_article"] = False
-                
-                doc.metadata = metadata
-                filtered_docs.append(doc)
-        
-        print(f"Nombre de chunks créés: {len(filtered_docs)}")
-        
-        # Afficher quelques statistiques sur les métadonnées
-        articles_count = sum(1 for doc in filtered_docs if doc.metadata.get("has_article", False))
-        print(f"Chunks contenant des articles: {articles_count}/{len(filtered_docs)}")
-        
-        return filtered_docs
+            # Ajouter l'unité au chunk en cours
+            if chunk_start is None:
+                chunk_start = unit_start
+            chunk_end = unit_end
+            chunk_words += unit_words
+            if article_number is not None:
+                chunk_articles.append((article_number, article_start, unit_end))
+        
+        if chunk_start is not None:
+            yield self._build_chunk(text, chunk_start, chunk_end, chunk_articles, outline, chunk_count)
     
-    def _create_embeddings(self, documents: List[Document]) -> List[List[float]]:
-        """
-        Crée les embeddings pour les documents avec normalisation cosine
+    def _create_embeddings(self, documents: List[Document]) -> np.ndarray:
         """
-        print("Création des embeddings...")
+        Crée les embeddings d'un lot de documents avec normalisation cosine
         
+        Returns:
+            Matrice float32 (nombre de documents, dimension)
+        """
         texts = [doc.page_content for doc in documents]
         
-        # Créer les embeddings avec SentenceTransformer pour plus de contrôle
-        embeddings = self.sentence_transformer.encode(
-            texts,
-            normalize_embeddings=True,  # Normalisation cosine
-            show_progress_bar=True,
-            device='cpu'
-        )
-        
-        # Convertir en liste de listes pour Qdrant
-        embeddings_list = [embedding.tolist() for embedding in embeddings]
-        
-        print(f"Embeddings créés: {len(embeddings_list)} vecteurs de dimension {len(embeddings_list[0])}")
-        return embeddings_list
+        # Créer les embeddings normalisés (cosine) avec le modèle partagé
+        return self.embedding_model.encode(texts, batch_size=self.embed_batch_size)
     
-    def _index_documents(self, documents: List[Document], embeddings: List[List[float]]):
+    def _build_payload(self, doc: Document) -> Dict[str, Any]:
+        """
+        Construit le payload d'un point avec la structure LangChain enrichie
+        """
+        return {
+            "page_content": doc.page_content,  # Structure LangChain
+            "metadata": {  # Métadonnées enrichies dans un objet séparé
+                "source": doc.metadata.get("source", ""),
+                "chunk_id": doc.metadata.get("chunk_id", 0),
+                "word_count": doc.metadata.get("word_count", 0),
+                "article_number": doc.metadata.get("article_number", ""),
+                "all_articles": doc.metadata.get("all_articles", []),
+                "articles_count": doc.metadata.get("articles_count", 0),
+                "article_offsets": doc.metadata.get("article_offsets", []),
+                "article_text": doc.metadata.get("article_text", ""),
+                "has_article": doc.metadata.get("has_article", False),
+                "livre_numero": doc.metadata.get("livre_numero", ""),
+                "livre_titre": doc.metadata.get("livre_titre", ""),
+                "titre_numero": doc.metadata.get("titre_numero", ""),
+                "titre_titre": doc.metadata.get("titre_titre", ""),
+                "chapitre_numero": doc.metadata.get("chapitre_numero", ""),
+                "chapitre_titre": doc.metadata.get("chapitre_titre", ""),
+                "section_numero": doc.metadata.get("section_numero", ""),
+                "section_titre": doc.metadata.get("section_titre", ""),
+                "sous_section_numero": doc.metadata.get("sous_section_numero", ""),
+                "sous_section_titre": doc.metadata.get("sous_section_titre", ""),
+                "content_hash": doc.metadata.get("content_hash", "")
+            }
+        }
+    
+    def _index_documents(self, documents: List[Document], embeddings: np.ndarray, point_ids: List[str]):
         """
-        Indexe les documents dans Qdrant avec la structure LangChain
+        Indexe un lot de documents dans Qdrant avec la structure LangChain.
+        La collection n'est jamais vidée : les points sont insérés ou remplacés un à un.
+        Les vecteurs restent en numpy float32 jusqu'à l'envoi à Qdrant.
         """
-        print("Indexation des documents dans Qdrant...")
-        
-        # Vider la collection existante
-        try:
-            self.qdrant_client.delete_collection(self.collection_name)
-        except:
-            pass
-        
-        # Recréer la collection
-        self._create_collection_if_not_exists()
-        
-        # Préparer les points pour l'insertion avec la structure LangChain enrichie
-        points = []
-        for i, (doc, embedding) in enumerate(zip(documents, embeddings)):
-            point = PointStruct(
-                id=i,
-                vector={"dense": embedding},  # Utiliser le nom "dense" pour le vecteur
-                payload={
-                    "page_content": doc.page_content,  # Structure LangChain
-                    "metadata": {  # Métadonnées enrichies dans un objet séparé
-                        "source": doc.metadata.get("source", ""),
-                        "chunk_id": doc.metadata.get("chunk_id", i),
-                        "word_count": doc.metadata.get("word_count", 0),
-                        "article_number": doc.metadata.get("article_number", ""),
-                        "all_articles": doc.metadata.get("all_articles", []),
-                        "articles_count": doc.metadata.get("articles_count", 0),
-                        "article_text": doc.metadata.get("article_text", ""),
-                        "has_article": doc.metadata.get("has_article", False),
-                        "livre_numero": doc.metadata.get("livre_numero", ""),
-                        "livre_titre": doc.metadata.get("livre_titre", ""),
-                        "titre_numero": doc.metadata.get("titre_numero", ""),
-                        "titre_titre": doc.metadata.get("titre_titre", ""),
-                        "chapitre_numero": doc.metadata.get("chapitre_numero", ""),
-                        "chapitre_titre": doc.metadata.get("chapitre_titre", ""),
-                        "section_numero": doc.metadata.get("section_numero", ""),
-                        "section_titre": doc.metadata.get("section_titre", ""),
-                        "sous_section_numero": doc.metadata.get("sous_section_numero", ""),
-                        "sous_section_titre": doc.metadata.get("sous_section_titre", "")
-                    }
-                }
-            )
-            points.append(point)
-        
-        # Insérer les points par batch
-        batch_size = 100
-        for i in range(0, len(points), batch_size):
-            batch = points[i:i + batch_size]
-            self.qdrant_client.upsert(
-                collection_name=self.collection_name,
-                points=batch
-            )
-            print(f"Batch {i//batch_size + 1}/{(len(points)-1)//batch_size + 1} indexé")
-        
-        print(f"Indexation terminée: {len(points)} documents indexés dans la collection '{self.collection_name}'")
+        self.qdrant_client.upload_collection(
+            collection_name=self.collection_name,
+            vectors={"dense": embeddings},  # Utiliser le nom "dense" pour le vecteur
+            payload=[self._build_payload(doc) for doc in documents],
+            ids=point_ids,
+            batch_size=self.upsert_batch_size,
+            wait=True
+        )
+    
+    def _iter_batches(self, documents: Iterator[Document], plan: IncrementalPlan, batch_size: int) -> Iterator[Tuple[List[Document], List[str]]]:
+        """
+        Regroupe en lots de batch_size les chunks nouveaux ou modifiés
+        """
+        batch, batch_ids = [], []
+        for doc in documents:
+            doc.metadata["content_hash"] = content_hash(doc.page_content, doc.metadata)
+            doc_point_id = plan.point_to_index(doc.metadata["content_hash"], doc.metadata["chunk_id"])
+            if doc_point_id is None:
+                continue
+            batch.append(doc)
+            batch_ids.append(doc_point_id)
+            if len(batch) >= batch_size:
+                yield batch, batch_ids
+                batch, batch_ids = [], []
+        if batch:
+            yield batch, batch_ids
     
     def search_similar(self, query: str, limit: int = 5, filter_article: str = None, filter_livre: str = None, filter_titre: str = None) -> List[Dict[str, Any]]:
         """
@@ -451,15 +385,17 @@ class CodeCivilIndexer:
             query: Requête de recherche
             limit: Nombre maximum de résultats
             filter_article: Numéro d'article spécifique à rechercher (ex: "1", "6-1")
-            filter_livre: Numéro de livre à filtrer (ex: "Ier", "II")
-            filter_titre: Numéro de titre à filtrer (ex: "Ier", "préliminaire")
+            filter_livre: Numéro de livre à filtrer (ex: "Ier", "II", "2")
+            filter_titre: Numéro de titre à filtrer (ex: "Ier", "IV bis", "préliminaire")
         """
+        # Numéros de livre et de titre normalisés comme dans le payload
+        if filter_livre:
+            filter_livre = normalize_division_number(filter_livre) or filter_livre
+        if filter_titre:
+            filter_titre = normalize_division_number(filter_titre) or filter_titre
+        
         # Créer l'embedding de la requête
-        query_embedding = self.sentence_transformer.encode(
-            [query], 
-            normalize_embeddings=True,
-            device='cpu'
-        )[0].tolist()
+        query_embedding = self.embedding_model.embed_query(query)
         
         # Construire les filtres si spécifiés
         search_filter = None
@@ -494,6 +430,7 @@ class CodeCivilIndexer:
             collection_name=self.collection_name,
             query_vector=("dense", query_embedding),  # Utiliser le nom "dense" pour la recherche
             query_filter=search_filter,
+            search_params=build_search_params(),  # Rescoring des vecteurs quantifiés
             limit=limit
         )
         
@@ -552,49 +489,43 @@ class CodeCivilIndexer:
         
         return results
     
-    def search_by_article(self, article_number: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def _scroll_by_articles(self, article_numbers: List[str], limit: int) -> List[Any]:
         """
-        Recherche spécifique par numéro d'article
+        Récupère les chunks contenant l'un des articles par un filtre sur l'index
+        metadata.all_articles, sans recherche vectorielle
         """
-        return self.search_similar(
-            query=f"Article {article_number}",
+        points, _ = self.qdrant_client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=models.Filter(must=[
+                models.FieldCondition(
+                    key="metadata.all_articles",
+                    match=models.MatchAny(any=article_numbers)
+                )
+            ]),
             limit=limit,
-            filter_article=article_number
+            with_payload=True,
+            with_vectors=False
         )
+        return points
+    
+    def search_by_article(self, article_number: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Recherche spécifique par numéro d'article (filtre sur l'index des articles)
+        
+        Returns:
+            Chunks contenant l'article, avec le texte exact de l'article dans "article_content"
+        """
+        return self.search_by_multiple_articles([article_number], limit=limit)
     
     def search_by_multiple_articles(self, article_numbers: List[str], limit: int = 10) -> List[Dict[str, Any]]:
         """
-        Recherche dans les chunks contenant l'un des articles spécifiés
+        Recherche dans les chunks contenant l'un des articles spécifiés (filtre sur l'index des articles)
         """
-        # Créer un filtre pour chercher les chunks contenant l'un des articles
-        conditions = []
-        for article in article_numbers:
-            conditions.append({
-                "key": "metadata.all_articles",
-                "match": {"any": [article]}
-            })
-        
-        search_filter = {"should": conditions} if len(conditions) > 1 else conditions[0]
-        
-        # Effectuer la recherche avec un embedding générique
-        query_text = f"Articles {', '.join(article_numbers)}"
-        query_embedding = self.sentence_transformer.encode(
-            [query_text], 
-            normalize_embeddings=True,
-            device='cpu'
-        )[0].tolist()
+        article_numbers = [normalize_article_number(article) for article in article_numbers]
         
-        search_result = self.qdrant_client.search(
-            collection_name=self.collection_name,
-            query_vector=("dense", query_embedding),
-            query_filter=search_filter,
-            limit=limit
-        )
-        
-        # Formater les résultats
         results = []
-        for hit in search_result:
-            metadata = hit.payload["metadata"]
+        for point in self._scroll_by_articles(article_numbers, limit):
+            metadata = point.payload["metadata"]
             
             # Construire le contexte hiérarchique
             hierarchy_context = []
@@ -609,9 +540,16 @@ class CodeCivilIndexer:
             if metadata.get("sous_section_numero") and metadata.get("sous_section_titre"):
                 hierarchy_context.append(f"Sous-section {metadata['sous_section_numero']}: {metadata['sous_section_titre']}")
             
+            # Texte exact des articles demandés, grâce à leur position dans le chunk
+            article_content = "\n\n".join(
+                point.payload["page_content"][offset["start"]:offset["end"]]
+                for offset in metadata.get("article_offsets", [])
+                if offset["article"] in article_numbers
+            )
+            
             result = {
-                "text": hit.payload["page_content"],
-                "score": hit.score,
+                "text": point.payload["page_content"],
+                "score": None,  # Correspondance exacte, pas de score de similarité
                 "chunk_id": metadata["chunk_id"],
                 "word_count": metadata["word_count"],
                 "source": metadata["source"],
@@ -619,6 +557,7 @@ class CodeCivilIndexer:
                 "all_articles": metadata.get("all_articles", []),
                 "articles_count": metadata.get("articles_count", 0),
                 "article_text": metadata.get("article_text", ""),
+                "article_content": article_content,
                 "has_article": metadata.get("has_article", False),
                 "hierarchy_context": " > ".join(hierarchy_context) if hierarchy_context else "",
                 "matched_articles": [art for art in metadata.get("all_articles", []) if art in article_numbers],
@@ -645,6 +584,8 @@ class CodeCivilIndexer:
             }
             results.append(result)
         
+        # Chunks dans l'ordre du code
+        results.sort(key=lambda result: result["chunk_id"])
         return results
     
     def search_by_livre(self, livre_numero: str, query: str = "", limit: int = 10) -> List[Dict[str, Any]]:
@@ -658,12 +599,19 @@ class CodeCivilIndexer:
             filter_livre=livre_numero
         )
     
-    def index_code_civil(self):
+    def index_code_civil(self, processes: int = 1):
         """
         Lance le processus complet d'indexation du Code Civil
+        
+        Args:
+            processes: Nombre de processus d'encodage (1 = encodage dans le processus courant)
         """
         print("=== Début de l'indexation du Code Civil ===")
         
+        # Écritures Qdrant en arrière-plan pendant l'encodage des lots suivants
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdrant-writer")
+        pending_writes = deque()
+        
         try:
             # 1. Créer la collection si nécessaire
             self._create_collection_if_not_exists()
@@ -671,16 +619,50 @@ class CodeCivilIndexer:
             # 2. Charger et préprocesser le texte
             text = self._load_and_preprocess_text()
             
-            # 3. Créer les chunks
-            documents = self._create_chunks(text)
+            # 3. Pipeline en flux : découpage -> empreinte -> embedding par lots -> insertion
+            existing_positions = get_existing_chunk_positions(self.qdrant_client, self.collection_name)
+            plan = IncrementalPlan(set(existing_positions), existing_positions)
+            indexed_count = 0
+            
+            self.embedding_model.start_pool(processes)
+            start_time = time.perf_counter()
+            
+            for batch, batch_ids in self._iter_batches(self._iter_chunks(text), plan, self.embed_batch_size * processes):
+                embeddings = self._create_embeddings(batch)
+                
+                # Limiter les écritures en attente pour borner la mémoire
+                if len(pending_writes) >= self.max_pending_writes:
+                    pending_writes.popleft().result()
+                pending_writes.append(writer.submit(self._index_documents, batch, embeddings, batch_ids))
+                
+                indexed_count += len(batch)
+                elapsed = time.perf_counter() - start_time
+                print(f"{indexed_count} chunks encodés ({indexed_count / elapsed:.1f} chunks/s, "
+                      f"mémoire max: {peak_memory_mb():.0f} Mo)")
+            
+            # Attendre la fin des écritures
+            while pending_writes:
+                pending_writes.popleft().result()
+            
+            if indexed_count:
+                elapsed = time.perf_counter() - start_time
+                print(f"Débit: {indexed_count / elapsed:.1f} chunks/s avec {processes} processus d'encodage")
             
-            # 4. Créer les embeddings
-            embeddings = self._create_embeddings(documents)
+            # 4. Supprimer les chunks disparus, après l'insertion des nouveaux
+            to_delete = plan.stale_ids()
+            delete_points(self.qdrant_client, self.collection_name, to_delete)
             
-            # 5. Indexer dans Qdrant
-            self._index_documents(documents, embeddings)
+            # Position à jour des chunks inchangés : l'ordre des résultats suit le chunk_id
+            update_chunk_positions(self.qdrant_client, self.collection_name, plan.moved)
+            print(f"Chunks nouveaux ou modifiés: {indexed_count}, supprimés: {len(to_delete)}, "
+                  f"inchangés: {plan.kept_count - indexed_count} (dont {len(plan.moved)} décalés)")
+            
+            # Nouvelle version de la collection : invalide les caches de résultats du service
+            if indexed_count or to_delete or plan.moved:
+                write_collection_version(self.collection_name)
             
             print("=== Indexation terminée avec succès ===")
+            print(f"Mémoire maximale utilisée: {peak_memory_mb():.0f} Mo")
             
             # Afficher les statistiques
             collection_info = self.qdrant_client.get_collection(self.collection_name)
@@ -689,14 +671,57 @@ class CodeCivilIndexer:
         except Exception as e:
             print(f"Erreur lors de l'indexation: {e}")
             raise
+        
+        finally:
+            writer.shutdown(wait=True)
+            self.embedding_model.stop_pool()
+    
+    def benchmark_embedding(self, max_processes: int, sample_size: int = 512) -> Dict[int, float]:
+        """
+        Mesure le débit d'encodage (chunks/s) de 1 à max_processes processus
+        sur un échantillon de chunks du Code Civil, sans écrire dans Qdrant
+        """
+        text = self._load_and_preprocess_text()
+        sample = []
+        for doc in self._iter_chunks(text):
+            sample.append(doc)
+            if len(sample) >= sample_size:
+                break
+        
+        results = {}
+        # 1, 2, 4, ... jusqu'à max_processes inclus
+        process_counts = sorted({2 ** k for k in range(max_processes.bit_length())} | {max(max_processes, 1)})
+        for processes in process_counts:
+            self.embedding_model.start_pool(processes)
+            try:
+                start_time = time.perf_counter()
+                for i in range(0, len(sample), self.embed_batch_size * processes):
+                    self._create_embeddings(sample[i:i + self.embed_batch_size * processes])
+                results[processes] = len(sample) / (time.perf_counter() - start_time)
+            finally:
+                self.embedding_model.stop_pool()
+            print(f"{processes} processus: {results[processes]:.1f} chunks/s "
+                  f"(x{results[processes] / results[1]:.2f})")
+        
+        return results
 
 
 def main():
     """
     Fonction principale pour lancer l'indexation
     """
+    parser = argparse.ArgumentParser(description="Indexation du Code Civil dans Qdrant")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("INDEX_EMBED_PROCESSES", "1")),
+                        help="Nombre de processus d'encodage")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Mesure le débit d'encodage de 1 à --processes processus sans indexer")
+    args = parser.parse_args()
+    
     indexer = CodeCivilIndexer()
-    indexer.index_code_civil()
+    if args.benchmark:
+        indexer.benchmark_embedding(args.processes)
+    else:
+        indexer.index_code_civil(processes=args.processes)
 
 
 if __name__ == "__main__":
@@ -1,67 +1,85 @@
 import os
 import re
 import json
-from typing import List, Dict, Tuple, Optional
-from langchain_core.documents import Document
-from langchain_qdrant import QdrantVectorStore, FastEmbedSparse, RetrievalMode
-from langchain_huggingface import HuggingFaceEmbeddings
+import time
+import argparse
+import tempfile
+import multiprocessing
+from glob import glob
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, List, Dict, Set, Tuple, Optional, Union
+from langchain_qdrant import FastEmbedSparse
+from EmbeddingBackend import SentenceTransformerEmbeddings, get_embedding_backend
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, SparseVectorParams
-import numpy as np
+from qdrant_client.models import SparseVector, PointStruct
+from collection_config import CollectionOptions, QUANTIZATION_MODES
+from collection_version import write_collection_version
+from incremental_index import content_hash, point_id, get_existing_point_ids, plan_incremental_update, delete_points
+from ArticleStore import normalize_article_number
+from query_filters import heading_division_number, ensure_payload_indexes
+from qdrant_backend import get_qdrant_client, describe_backend
+
+
+# Configuration
+DOCUMENTS_DIR = "./documents"
+CODE_CIVIL_PATH = "./documents/code-civil.txt"
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "2"))  # Processus d'indexation simultanés (un modèle par processus)
+UPSERT_BATCH_SIZE = 64  # Points envoyés à Qdrant par requête
+
+# Une seule expression pour reconnaître toutes les lignes de structure
+STRUCTURE_LINE_PATTERN = re.compile(r"^(Titre|Livre|Chapitre|Section|Sous-section|Article)\s+(.+)$", re.IGNORECASE)
+STRUCTURE_TYPES = {
+    "titre": "Titre",
+    "livre": "Livre",
+    "chapitre": "Chapitre",
+    "section": "Section",
+    "sous-section": "Sous-section",
+    "article": "Article",
+}
+SENTENCE_SPLIT_PATTERN = re.compile(r'[.!?]+')
+
+# Titre de livre ou de titre du code (ex: "Livre Ier : Des personnes"), à l'exclusion des lignes
+# de texte commençant par "livre" ou "titre"
+DIVISION_HEADING_PATTERN = re.compile(r"^(Livre|Titre)\s+([^\n]*:)")
+
+
+def collection_name_for_document(document_path: str) -> str:
+    """Nom de la collection d'un code : nom du fichier suivi de "-2" (ex: code-civil.txt -> code-civil-2)"""
+    return f"{Path(document_path).stem}-2"
 
 
 class CodeCivilIndexer:
-    def __init__(self):
+    def __init__(self, embeddings: Optional[SentenceTransformerEmbeddings] = None,
+                 document_path: str = CODE_CIVIL_PATH, collection_name: Optional[str] = None):
         # Charger les variables d'environnement
         load_dotenv("../.env")
         
-        # Initialiser les embeddings
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=os.getenv("EMBEDDED_MODEL"),
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"device": "cpu"}
-        )
+        # Initialiser les embeddings (modèle partagé, chargé une seule fois par processus)
+        self.embeddings = embeddings or get_embedding_backend(os.getenv("EMBEDDED_MODEL"))
         
         # Initialiser les sparse embeddings
         self.sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
         
-        # Chemin vers le fichier du code civil
-        self.code_civil_path = "./documents/code-civil.txt"
+        # Chemin vers le fichier du code à indexer
+        self.code_civil_path = document_path
         
         # Collection name
-        self.collection_name = "code-civil-2"
-        
-        # Qdrant database path
-        self.db_path = "./qdrant_db"
+        self.collection_name = collection_name or collection_name_for_document(document_path)
         
         # Taille maximale des chunks en mots
         self.max_chunk_words = 520
         
     def detect_embedding_dimensions(self) -> int:
-        """Détecte automatiquement le nombre de dimensions du modèle d'embedding."""
-        sample_text = "Ceci est un texte d'exemple pour détecter les dimensions."
-        sample_embedding = self.embeddings.embed_query(sample_text)
-        return len(sample_embedding)
+        """Lit le nombre de dimensions dans la configuration du modèle d'embedding."""
+        return self.embeddings.dimension
     
     def parse_structure_line(self, line: str) -> Tuple[str, str]:
         """Parse une ligne pour identifier le type de structure et son contenu."""
-        line = line.strip()
-        
-        # Patterns pour identifier les différentes structures
-        patterns = {
-            "Titre": r"^Titre\s+(.+)$",
-            "Livre": r"^Livre\s+(.+)$", 
-            "Chapitre": r"^Chapitre\s+(.+)$",
-            "Section": r"^Section\s+(.+)$",
-            "Sous-section": r"^Sous-section\s+(.+)$",
-            "Article": r"^Article\s+(.+)$"
-        }
-        
-        for structure_type, pattern in patterns.items():
-            match = re.match(pattern, line, re.IGNORECASE)
-            if match:
-                return structure_type, match.group(1).strip()
+        match = STRUCTURE_LINE_PATTERN.match(line.strip())
+        if match:
+            return STRUCTURE_TYPES[match.group(1).lower()], match.group(2).strip()
         
         return None, None
     
@@ -70,10 +88,11 @@ class CodeCivilIndexer:
         return len(text.split())
     
     def parse_code_civil(self) -> List[Dict]:
-        """Parse le fichier code-civil.txt et retourne une liste de chunks avec métadonnées."""
-        with open(self.code_civil_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
+        """
+        Parse le fichier code-civil.txt et retourne une liste de chunks avec métadonnées.
+        Lecture en un seul passage : le nombre de mots du chunk en cours est tenu à jour
+        et son texte est accumulé en fragments, joints une seule fois à la sauvegarde.
+        """
         chunks = []
         current_metadata = {
             "Livre": "",
@@ -83,190 +102,191 @@ class CodeCivilIndexer:
             "SousSection": "",
             "Articles": []
         }
+        levels = ["Titre", "Livre", "Chapitre", "Section", "SousSection", "Articles"]
+        
+        # Numéros normalisés du livre et du titre en cours (champs filtrables)
+        divisions = {"livre_numero": "", "titre_numero": ""}
         
-        current_chunk_text = ""
+        # Chunk en cours
+        chunk_fragments: List[str] = []
+        chunk_words = 0
         current_articles = []
         
+        # Article en cours de lecture (None hors article)
+        article_number = None
+        article_lines: List[str] = []
+        
         def reset_metadata_from_level(level: str):
             """Reset les métadonnées à partir d'un certain niveau hiérarchique."""
-            levels = ["Titre", "Livre", "Chapitre", "Section", "SousSection", "Articles"]
-            reset_index = levels.index(level)
-            
-            for i in range(reset_index + 1, len(levels)):
-                if levels[i] == "Articles":
-                    current_metadata["Articles"] = []
-                else:
-                    current_metadata[levels[i]] = ""
+            for next_level in levels[levels.index(level) + 1:]:
+                current_metadata[next_level] = [] if next_level == "Articles" else ""
         
         def save_current_chunk():
-            """Sauvegarde le chunk actuel s'il contient du texte."""
-            if current_chunk_text.strip():
+            """Sauvegarde le chunk actuel s'il contient du texte et en démarre un nouveau."""
+            nonlocal chunk_fragments, chunk_words, current_articles
+            if chunk_words:
                 chunk_metadata = current_metadata.copy()
-                chunk_metadata["Articles"] = current_articles.copy()
+                chunk_metadata["Articles"] = current_articles
+                chunk_metadata.update(divisions)
+                chunk_metadata["all_articles"] = list(dict.fromkeys(
+                    normalize_article_number(article["Article"]) for article in current_articles
+                ))
                 
                 chunks.append({
-                    "text": current_chunk_text.strip(),
+                    "text": "".join(chunk_fragments).strip(),
                     "metadata": chunk_metadata
                 })
+            chunk_fragments, chunk_words, current_articles = [], 0, []
         
-        def start_new_chunk():
-            """Démarre un nouveau chunk."""
-            nonlocal current_chunk_text, current_articles
-            current_chunk_text = ""
-            current_articles = []
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
+        def close_article():
+            """Ajoute l'article lu au chunk, en démarrant un nouveau chunk si la limite de mots est atteinte."""
+            nonlocal chunk_words
+            article_text = " ".join(article_lines)
             
-            # Ignorer les lignes vides
-            if not line:
-                i += 1
-                continue
+            # Créer les métadonnées de l'article
+            article_info = {
+                "Article": article_number,
+                "First_Sentence": "",
+                "Last_Sentence": ""
+            }
+            
+            # Extraire la première et dernière phrase si possible
+            sentences = [sentence.strip() for sentence in SENTENCE_SPLIT_PATTERN.split(article_text) if sentence.strip()]
+            if sentences:
+                article_info["First_Sentence"] = sentences[0]
+                article_info["Last_Sentence"] = sentences[-1]
             
-            # Identifier le type de structure
-            structure_type, content = self.parse_structure_line(line)
+            # Vérifier si ajouter cet article dépasserait la limite de mots
+            article_words = 1 + len(article_number.split()) + len(article_text.split())
+            if chunk_words + article_words > self.max_chunk_words and chunk_words:
+                save_current_chunk()
             
-            if structure_type:
-                if structure_type in ["Titre", "Livre", "Chapitre", "Section", "SousSection"]:
+            # Ajouter l'article au chunk actuel
+            chunk_fragments.append(f"\n\nArticle {article_number}\n\n{article_text}")
+            chunk_words += article_words
+            current_articles.append(article_info)
+        
+        with open(self.code_civil_path, 'r', encoding='utf-8') as f:
+            for raw_line in f:
+                line = raw_line.strip()
+                
+                # Ignorer les lignes vides
+                if not line:
+                    continue
+                
+                # Identifier le type de structure
+                structure_type, content = self.parse_structure_line(line)
+                
+                if structure_type is None:
+                    # Ligne de contenu : n'est conservée qu'à l'intérieur d'un article
+                    if article_number is not None:
+                        article_lines.append(line)
+                    continue
+                
+                # Toute structure termine l'article en cours
+                if article_number is not None:
+                    close_article()
+                    article_number, article_lines = None, []
+                
+                if structure_type == "Article":
+                    article_number = content
+                elif structure_type in ["Titre", "Livre", "Chapitre", "Section", "SousSection"]:
                     # Pour ces niveaux, on sauvegarde le chunk actuel et on en démarre un nouveau
                     save_current_chunk()
-                    start_new_chunk()
                     
                     # Mettre à jour les métadonnées
-                    if structure_type == "SousSection":
-                        current_metadata["SousSection"] = content
-                        reset_metadata_from_level("SousSection")
-                    else:
-                        current_metadata[structure_type] = content
-                        reset_metadata_from_level(structure_type)
+                    current_metadata[structure_type] = content
+                    reset_metadata_from_level(structure_type)
                 
-                elif structure_type == "Article":
-                    # Collecter le contenu de l'article
-                    article_content = []
-                    i += 1
-                    
-                    # Lire le contenu de l'article jusqu'à la prochaine structure
-                    while i < len(lines):
-                        next_line = lines[i].strip()
-                        if not next_line:
-                            i += 1
-                            continue
-                        
-                        next_structure_type, _ = self.parse_structure_line(next_line)
-                        if next_structure_type:
-                            i -= 1  # Revenir en arrière pour traiter cette ligne au prochain tour
-                            break
-                        
-                        article_content.append(next_line)
-                        i += 1
-                    
-                    article_text = " ".join(article_content)
-                    
-                    # Créer les métadonnées de l'article
-                    article_info = {
-                        "Article": content,
-                        "First_Sentence": "",
-                        "Last_Sentence": ""
-                    }
-                    
-                    # Extraire la première et dernière phrase si possible
-                    if article_text:
-                        sentences = re.split(r'[.!?]+', article_text)
-                        sentences = [s.strip() for s in sentences if s.strip()]
-                        
-                        if sentences:
-                            article_info["First_Sentence"] = sentences[0]
-                            article_info["Last_Sentence"] = sentences[-1]
-                    
-                    # Vérifier si ajouter cet article dépasserait la limite de mots
-                    potential_text = current_chunk_text + f"\n\nArticle {content}\n\n{article_text}"
-                    
-                    if self.count_words(potential_text) > self.max_chunk_words and current_chunk_text.strip():
-                        # Sauvegarder le chunk actuel et démarrer un nouveau
-                        save_current_chunk()
-                        start_new_chunk()
-                    
-                    # Ajouter l'article au chunk actuel
-                    current_chunk_text += f"\n\nArticle {content}\n\n{article_text}"
-                    current_articles.append(article_info)
-            
-            i += 1
+                division_match = DIVISION_HEADING_PATTERN.match(line)
+                if division_match:
+                    if division_match.group(1) == "Livre":
+                        divisions["livre_numero"] = heading_division_number(division_match.group(2))
+                        divisions["titre_numero"] = ""
+                    else:
+                        divisions["titre_numero"] = heading_division_number(division_match.group(2))
+        
+        if article_number is not None:
+            close_article()
         
         # Sauvegarder le dernier chunk
         save_current_chunk()
         
         return chunks
     
-    def create_qdrant_collection(self):
-        """Crée ou recrée la collection Qdrant."""
-        client = QdrantClient(path=self.db_path)
-        
-        # Supprimer la collection si elle existe
-        try:
-            client.delete_collection(self.collection_name)
-            print(f"Collection '{self.collection_name}' supprimée.")
-        except Exception:
-            print(f"Collection '{self.collection_name}' n'existait pas.")
-        
-        # Détecter les dimensions
-        vector_size = self.detect_embedding_dimensions()
-        print(f"Dimensions détectées: {vector_size}")
-        
-        # Créer la nouvelle collection
-        client.create_collection(
-            collection_name=self.collection_name,
-            vectors_config={
-                "dense": VectorParams(
-                    size=vector_size,
-                    distance=Distance.COSINE
-                )
-            },
-            sparse_vectors_config={
-                "sparse": SparseVectorParams()
-            }
-        )
-        
-        print(f"Collection '{self.collection_name}' créée avec succès.")
+    def create_qdrant_collection(self, client: QdrantClient, options: Optional[CollectionOptions] = None):
+        """Crée la collection Qdrant si elle n'existe pas encore, ainsi que les index des champs filtrables."""
+        ensure_qdrant_collection(client, self.collection_name, self.detect_embedding_dimensions(), options)
     
-    def index_documents(self):
-        """Index les documents dans Qdrant."""
-        print("Parsing du Code Civil...")
+    def prepare_documents(self, existing_ids: Set[Union[int, str]]) -> Dict[str, Any]:
+        """
+        Parse le code et embedde les chunks nouveaux ou modifiés, sans accéder à Qdrant :
+        peut s'exécuter dans un processus de travail pendant que le processus principal écrit.
+        
+        :param existing_ids: Identifiants des points déjà présents dans la collection
+        :return: Points à insérer et identifiants à supprimer (voir write_prepared_documents)
+        """
+        print(f"Parsing de {self.code_civil_path}...")
         chunks = self.parse_code_civil()
         print(f"Nombre de chunks créés: {len(chunks)}")
         
-        print("Création de la collection Qdrant...")
-        self.create_qdrant_collection()
-        
-        print("Conversion en documents Langchain...")
-        documents = []
+        texts = []
+        metadatas = []
+        chunk_hashes = []
         for i, chunk in enumerate(chunks):
-            doc = Document(
-                page_content=chunk["text"],
-                metadata={
-                    **chunk["metadata"],
-                    "chunk_id": i
-                }
-            )
-            documents.append(doc)
+            metadata = {
+                **chunk["metadata"],
+                "chunk_id": i
+            }
+            metadata["content_hash"] = content_hash(chunk["text"], metadata)
+            chunk_hashes.append(metadata["content_hash"])
+            texts.append(chunk["text"])
+            metadatas.append(metadata)
+        
+        # Comparer les empreintes des chunks avec celles déjà indexées
+        to_index, to_delete = plan_incremental_update(existing_ids, chunk_hashes)
+        print(f"[{self.collection_name}] Chunks nouveaux ou modifiés: {len(to_index)}, supprimés: {len(to_delete)}, "
+              f"inchangés: {len(chunks) - len(to_index)}")
         
-        print("Indexation dans Qdrant...")
-        vector_store = QdrantVectorStore.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            collection_name=self.collection_name,
-            path=self.db_path,
-            retrieval_mode=RetrievalMode.HYBRID,
-            vector_name="dense",
-            sparse_vector_name="sparse",
-            sparse_embedding=self.sparse_embeddings,
-        )
+        # Vecteurs dense et sparse, au format des documents LangChain (page_content + metadata)
+        points = []
+        if to_index:
+            print(f"[{self.collection_name}] Embedding de {len(to_index)} chunks...")
+            index_texts = [texts[i] for i in to_index]
+            dense_vectors = self.embeddings.encode(index_texts)
+            sparse_vectors = self.sparse_embeddings.embed_documents(index_texts)
+            for i, dense_vector, sparse_vector in zip(to_index, dense_vectors, sparse_vectors):
+                points.append(PointStruct(
+                    id=point_id(chunk_hashes[i]),
+                    vector={
+                        "dense": dense_vector.tolist(),
+                        "sparse": SparseVector(indices=sparse_vector.indices, values=sparse_vector.values)
+                    },
+                    payload={"page_content": texts[i], "metadata": metadatas[i]}
+                ))
         
-        print(f"Indexation terminée! {len(documents)} documents indexés dans la collection '{self.collection_name}'.")
+        self.print_statistics(chunks)
         
-        # Afficher quelques statistiques
-        print("\n=== Statistiques ===")
+        return {
+            "collection_name": self.collection_name,
+            "vector_size": self.detect_embedding_dimensions(),
+            "points": points,
+            "stale_ids": to_delete,
+            "chunk_count": len(chunks)
+        }
+    
+    def index_documents(self):
+        """Index les documents dans Qdrant en ne ré-embeddant que les chunks nouveaux ou modifiés."""
+        client = get_qdrant_client()
+        existing_ids = get_existing_point_ids(client, self.collection_name)
+        write_prepared_documents(client, self.prepare_documents(existing_ids))
+    
+    def print_statistics(self, chunks: List[Dict]):
+        """Affiche quelques statistiques sur les chunks du code."""
+        print(f"\n=== Statistiques ({self.collection_name}) ===")
         print(f"Nombre total de chunks: {len(chunks)}")
+        if not chunks:
+            return
         
         word_counts = [self.count_words(chunk["text"]) for chunk in chunks]
         print(f"Mots par chunk - Min: {min(word_counts)}, Max: {max(word_counts)}, Moyenne: {sum(word_counts)/len(word_counts):.1f}")
@@ -287,10 +307,182 @@ class CodeCivilIndexer:
             print()
 
 
+def ensure_qdrant_collection(client: QdrantClient, collection_name: str, vector_size: int,
+                             options: Optional[CollectionOptions] = None):
+    """
+    Crée la collection Qdrant si elle n'existe pas encore, ainsi que les index des champs filtrables.
+    Les options de stockage (quantization, disque, HNSW) ne s'appliquent qu'à la création :
+    supprimer la collection pour la reconstruire avec d'autres options.
+    """
+    if client.collection_exists(collection_name):
+        print(f"La collection '{collection_name}' existe déjà, mise à jour incrémentale.")
+        ensure_payload_indexes(client, collection_name)
+        return
+    
+    options = options or CollectionOptions()
+    print(f"Dimensions détectées: {vector_size}, {options}")
+    
+    # Créer la nouvelle collection
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={
+            "dense": options.dense_vector_params(vector_size)
+        },
+        sparse_vectors_config={
+            "sparse": options.sparse_vector_params()
+        }
+    )
+    
+    ensure_payload_indexes(client, collection_name)
+    
+    print(f"Collection '{collection_name}' créée avec succès.")
+
+
+def write_prepared_documents(client: QdrantClient, prepared: Dict[str, Any], options: Optional[CollectionOptions] = None):
+    """
+    Écrit dans Qdrant le résultat de prepare_documents : insertion des nouveaux points,
+    puis suppression des chunks disparus. Seul le processus principal accède à la base.
+    """
+    collection_name = prepared["collection_name"]
+    points = prepared["points"]
+    
+    ensure_qdrant_collection(client, collection_name, prepared["vector_size"], options)
+    
+    print(f"Indexation dans Qdrant ({collection_name})...")
+    for i in range(0, len(points), UPSERT_BATCH_SIZE):
+        client.upsert(collection_name=collection_name, points=points[i:i + UPSERT_BATCH_SIZE], wait=True)
+    
+    # Supprimer les chunks disparus, après l'insertion des nouveaux
+    delete_points(client, collection_name, prepared["stale_ids"])
+    
+    print(f"Indexation terminée! {len(points)} documents indexés dans la collection '{collection_name}'.")
+    
+    # Nouvelle version de la collection : invalide les caches de résultats du service
+    if points or prepared["stale_ids"]:
+        write_collection_version(collection_name)
+
+
+def _init_worker():
+    """Charge le modèle d'embedding une seule fois par processus de travail"""
+    load_dotenv("../.env")
+    get_embedding_backend(os.getenv("EMBEDDED_MODEL"))
+
+
+def _prepare_document(document_path: str, existing_ids: Set[Union[int, str]]) -> Dict[str, Any]:
+    """Parse et embedde un code dans un processus de travail"""
+    return CodeCivilIndexer(document_path=document_path).prepare_documents(existing_ids)
+
+
+def index_all_documents(document_paths: List[str], workers: int = INDEX_WORKERS,
+                        options: Optional[CollectionOptions] = None) -> List[str]:
+    """
+    Indexe chaque code dans sa propre collection. Le parsing et les embeddings sont répartis
+    entre plusieurs processus (un modèle chargé par processus) ; le processus principal,
+    seul à ouvrir la base Qdrant (locale ou serveur), écrit chaque code dès qu'il est prêt.
+    
+    :return: Chemins des documents dont l'indexation a échoué
+    """
+    client = get_qdrant_client()
+    print(f"🔗 Qdrant: {describe_backend()}")
+    existing_ids = {
+        path: get_existing_point_ids(client, collection_name_for_document(path))
+        for path in document_paths
+    }
+    failed = []
+    start = time.perf_counter()
+    
+    workers = min(workers, len(document_paths))
+    if workers <= 1:
+        for path in document_paths:
+            try:
+                prepared = CodeCivilIndexer(document_path=path).prepare_documents(existing_ids[path])
+                write_prepared_documents(client, prepared, options)
+            except Exception as e:
+                print(f"❌ Erreur lors de l'indexation de {path}: {e}")
+                failed.append(path)
+    else:
+        print(f"🔧 Indexation de {len(document_paths)} documents avec {workers} processus...")
+        # "spawn" : les processus ne dupliquent pas l'état (client Qdrant, threads) du processus principal
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker) as pool:
+            futures = {pool.submit(_prepare_document, path, existing_ids[path]): path for path in document_paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    write_prepared_documents(client, future.result(), options)
+                except Exception as e:
+                    print(f"❌ Erreur lors de l'indexation de {path}: {e}")
+                    failed.append(path)
+    
+    print(f"✅ {len(document_paths) - len(failed)}/{len(document_paths)} documents indexés "
+          f"en {time.perf_counter() - start:.1f}s")
+    return failed
+
+
+def benchmark_parse(repetitions: Tuple[int, ...] = (1, 2, 5, 10)):
+    """
+    Mesure le temps de parsing sur le code civil concaténé plusieurs fois :
+    un temps par Mo constant montre que le parsing est linéaire en la taille du corpus.
+    """
+    # Le parsing n'utilise pas les modèles : on évite de les charger
+    indexer = CodeCivilIndexer.__new__(CodeCivilIndexer)
+    indexer.max_chunk_words = 520
+    with open(CODE_CIVIL_PATH, 'r', encoding='utf-8') as f:
+        corpus = f.read()
+    
+    print("Répétitions | Taille (Mo) | Chunks | Temps (s) | Temps par Mo (s)")
+    for repetition in repetitions:
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as tmp_file:
+            tmp_file.write("\n".join([corpus] * repetition))
+            indexer.code_civil_path = tmp_file.name
+        try:
+            size_mb = os.path.getsize(indexer.code_civil_path) / (1024 * 1024)
+            start = time.perf_counter()
+            chunks = indexer.parse_code_civil()
+            elapsed = time.perf_counter() - start
+        finally:
+            os.remove(indexer.code_civil_path)
+        print(f"{repetition:>11} | {size_mb:>11.1f} | {len(chunks):>6} | {elapsed:>9.2f} | {elapsed / size_mb:>16.3f}")
+
+
 def main():
     """Fonction principale pour lancer l'indexation."""
-    indexer = CodeCivilIndexer()
-    indexer.index_documents()
+    parser = argparse.ArgumentParser(description="Indexation des codes dans Qdrant (une collection par code)")
+    parser.add_argument("documents", nargs="*",
+                        help=f"Fichiers .txt à indexer (par défaut : tous les fichiers {DOCUMENTS_DIR}/*.txt)")
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS,
+                        help="Nombre de processus d'indexation simultanés")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Mesure le temps de parsing sur un corpus de 1x à 10x le code civil")
+    
+    # Options de stockage des nouvelles collections (voir quantization_benchmark.py pour les comparer)
+    defaults = CollectionOptions()
+    parser.add_argument("--quantization", choices=QUANTIZATION_MODES, default=defaults.quantization,
+                        help="Quantization des vecteurs denses (scalar = int8, binary = 1 bit)")
+    parser.add_argument("--on-disk", action=argparse.BooleanOptionalAction, default=defaults.on_disk,
+                        help="Stocke les vecteurs originaux et le graphe HNSW sur disque")
+    parser.add_argument("--hnsw-m", type=int, default=defaults.hnsw_m, help="Paramètre m du graphe HNSW")
+    parser.add_argument("--hnsw-ef-construct", type=int, default=defaults.hnsw_ef_construct,
+                        help="Paramètre ef_construct du graphe HNSW")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        benchmark_parse()
+        return
+    
+    document_paths = args.documents or sorted(glob(os.path.join(DOCUMENTS_DIR, "*.txt")))
+    if not document_paths:
+        print(f"Aucun document à indexer dans {DOCUMENTS_DIR}")
+        return
+    
+    options = CollectionOptions(
+        quantization=args.quantization,
+        on_disk=args.on_disk,
+        hnsw_m=args.hnsw_m,
+        hnsw_ef_construct=args.hnsw_ef_construct
+    )
+    if index_all_documents(document_paths, workers=args.workers, options=options):
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
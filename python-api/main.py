@@ -1,21 +1,27 @@
+import os
 import re
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List
-from pdf_extractor import extract_pdf_text
-import torch
-from OllamaAgent import OllamaAgent, vectorstore, llm
-from utils import convert_prompt_to_langchain_messages, get_specific_civil_code_article
+from starlette.background import BackgroundTask
+from pdf_extractor import extract_pdf_text, stream_pdf_text, spool_upload, remove_spooled_file, count_pdf_pages
+from OllamaAgent import OllamaAgent, db_manager, vectorstore, llm, reranker
+from utils import convert_prompt_to_langchain_messages, get_specific_civil_code_articles
 from dict import find_numbers_in_string
+from qdrant_backend import is_server_mode, describe_backend, aclose_async_client
+from startup import StartupOrchestrator, ComponentNotReady
 
 # ------------------------------------------------------------------
 # 0.  Configuration
 # ------------------------------------------------------------------
 
-is_load = False
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))  # Processus uvicorn (plusieurs uniquement avec un serveur Qdrant)
+# Démarrage rapide : l'API répond pendant le chargement des modèles (sinon elle attend qu'ils soient prêts)
+FAST_START = os.getenv("FAST_START", "true").lower() in ("1", "true", "yes")
+STARTUP_WAIT_TIMEOUT = float(os.getenv("STARTUP_WAIT_TIMEOUT", "300"))  # Attente maximale d'un composant par requête (secondes)
 
 # Création de l'application FastAPI
 app = FastAPI(title="Assistant IA API", version="1.0.0")
@@ -23,7 +29,21 @@ app = FastAPI(title="Assistant IA API", version="1.0.0")
 # Initialiser l'agent RAG
 rag_agent = OllamaAgent()
 
-torch.cuda.empty_cache()
+def warm_up_llm():
+    """Charge le modèle dans Ollama"""
+    llm.invoke("Bonjour")
+
+# Composants chargés simultanément en arrière-plan ; les vectorstores attendent modèles et connexion
+startup = StartupOrchestrator()
+startup.register("dense_embeddings", db_manager.load_dense_embeddings)
+startup.register("sparse_embeddings", db_manager.load_sparse_embeddings)
+startup.register("qdrant", db_manager.connect)
+startup.register("vectorstores", db_manager.build_vectorstores,
+                 depends_on=("dense_embeddings", "sparse_embeddings", "qdrant"))
+startup.register("llm", warm_up_llm)
+if reranker is not None:
+    # Tant qu'il n'est pas chargé, les recherches gardent l'ordre de la recherche hybride
+    startup.register("reranker", reranker.load)
 
 # ------------------------------------------------------------------
 # 1.  CORS
@@ -57,8 +77,33 @@ def remove_think_tags(text: str) -> str:
     """Supprime les balises <think>...</think>"""
     return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
 
+async def require(*components: str):
+    """Attend que les composants nécessaires à un endpoint soient chargés (503 sinon)"""
+    try:
+        await startup.wait_ready(*components, timeout=STARTUP_WAIT_TIMEOUT)
+    except ComponentNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+# ------------------------------------------------------------------
+# 4.  Démarrage et arrêt
+# ------------------------------------------------------------------
+
+@app.on_event("startup")
+async def startup_event():
+    startup.start()
+    if not FAST_START:
+        try:
+            await startup.wait_ready()
+        except ComponentNotReady as e:
+            print(f"⚠️ Démarrage incomplet: {e}")
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Fermer les connexions du client Qdrant asynchrone
+    await aclose_async_client()
+
 # ------------------------------------------------------------------
-# 4.  Endpoints
+# 5.  Endpoints
 # ------------------------------------------------------------------
 
 @app.post("/api/resume")
@@ -99,6 +144,7 @@ async def ask_code_civil_endpoint(request: ChatRequest):
     """
     Endpoint pour interroger le code civil français.
     """
+    await require("vectorstores")
     
     try:
         
@@ -117,12 +163,12 @@ async def ask_code_civil_endpoint(request: ChatRequest):
                 message["content"] = "QUESTION DE L'UTILISATEUR: " + user_messages
                 break
 
-        context = "CONTEXTE: " + vectorstore.get_context(user_messages)
+        context = "CONTEXTE: " + await vectorstore.aget_context(user_messages)
         print(context)
         article_number = find_numbers_in_string(user_messages)
-        for article in article_number:
-            art = get_specific_civil_code_article(article)
-            context += f"\n\n{art}"
+        if article_number:
+            for art in get_specific_civil_code_articles(article_number):
+                context += f"\n\n{art}"
             
         messages.append({"role": "user", "content": context})
         messages = convert_prompt_to_langchain_messages(messages)
@@ -147,6 +193,7 @@ async def agent_chat_endpoint(request: ChatRequest):
     """
     Endpoint intelligent qui décide automatiquement s'il faut du contexte
     """
+    await require("vectorstores")
     try:
         messages = [{"role": m.role, "content": m.content} for m in request.messages]
 
@@ -165,33 +212,71 @@ async def agent_chat_endpoint(request: ChatRequest):
 
 
 @app.post("/api/pdf-extract")
-async def pdf_extract_endpoint(pdf: UploadFile = File(...)):
+async def pdf_extract_endpoint(pdf: UploadFile = File(...), stream: bool = False):
     if not pdf.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Le fichier doit être un PDF")
     try:
+        # Mode streaming : chaque page est envoyée (NDJSON) dès qu'elle est extraite
+        if stream:
+            path = await spool_upload(pdf)
+            try:
+                # Fichier illisible rejeté (400) avant l'envoi de la réponse
+                page_count = await count_pdf_pages(path)
+                # Fichier supprimé après la réponse, même si le client se déconnecte avant le premier octet
+                return StreamingResponse(
+                    stream_pdf_text(path, pdf.filename, page_count),
+                    media_type="application/x-ndjson",
+                    background=BackgroundTask(remove_spooled_file, path)
+                )
+            except Exception:
+                remove_spooled_file(path)
+                raise
         return await extract_pdf_text(pdf)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/load")
 async def load():
-    global is_load
-    if not is_load:
-        llm.invoke("Bonjour")
-        is_load = True
+    # Le modèle est chargé dans Ollama au démarrage, en parallèle des embeddings
+    await require("llm")
     return {"message": "Chargement des ressources..."}
 
+@app.get("/api/stats")
+async def stats():
+    return {
+        "embedding_cache": db_manager.get_cache_stats(),
+        "embedding_batching": db_manager.get_batching_stats(),
+        "retrieval_timings": vectorstore.get_timing_stats(),
+        "result_cache": vectorstore.get_cache_stats(),
+    }
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/ready")
+async def ready_check():
+    """État et durée de chargement de chaque composant (503 tant que tout n'est pas prêt)"""
+    report = startup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 @app.get("/")
 async def root():
     return {"message": "Assistant IA API", "version": "1.0.0"}
 
 # ------------------------------------------------------------------
-# 5.  Lancement
+# 6.  Lancement
 # ------------------------------------------------------------------
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    workers = API_WORKERS
+    if workers > 1 and not is_server_mode():
+        # La base locale ne peut être ouverte que par un seul processus
+        print(f"⚠️ {describe_backend()} : un seul worker possible, définir QDRANT_URL pour en lancer {workers}")
+        workers = 1
+    if workers > 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
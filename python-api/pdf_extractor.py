@@ -1,67 +1,219 @@
+import os
+import json
+import asyncio
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncGenerator, List, Optional, Tuple
 from fastapi import UploadFile, File, HTTPException
 import pdfplumber
 import PyPDF2
-from io import BytesIO
+
+# Configuration
+PDF_MAX_WORKERS = int(os.getenv("PDF_MAX_WORKERS", str(os.cpu_count() or 2)))  # Processus d'extraction
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))  # Pages traitées par tâche
+PDF_MAX_UPLOAD_MB = int(os.getenv("PDF_MAX_UPLOAD_MB", "200"))  # Taille maximale d'un PDF
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Copie du fichier reçu par blocs de 1 Mo
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Crée le pool de processus d'extraction à la première utilisation"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PDF_MAX_WORKERS)
+    return _process_pool
+
+
+def remove_spooled_file(path: str):
+    """Supprime un fichier temporaire créé par spool_upload (s'il existe encore)"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def spool_upload(file: UploadFile) -> str:
+    """
+    Copie le PDF reçu dans un fichier temporaire par blocs, sans jamais le charger
+    entièrement en mémoire. Les fichiers trop volumineux sont rejetés.
+
+    :return: Chemin du fichier temporaire (à supprimer par l'appelant)
+    """
+    max_size = PDF_MAX_UPLOAD_MB * 1024 * 1024
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Le fichier dépasse la taille maximale autorisée ({PDF_MAX_UPLOAD_MB} Mo)"
+    )
+
+    # Rejet immédiat si la taille est déjà connue
+    if file.size is not None and file.size > max_size:
+        raise too_large
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as tmp_file:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise too_large
+                tmp_file.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _count_pages(path: str) -> int:
+    """Compte les pages du PDF (exécuté dans le pool de processus)"""
+    try:
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+    except Exception as e:
+        print(f"Erreur avec pdfplumber: {e}")
+        return len(PyPDF2.PdfReader(path).pages)
+
+
+def _extract_pages(path: str, start: int, end: int) -> List[Tuple[int, str, str]]:
+    """
+    Extrait le texte des pages [start, end) (exécuté dans le pool de processus).
+    pdfplumber est utilisé en priorité, PyPDF2 prend le relais page par page.
+
+    :return: Liste de (numéro de page, texte, méthode)
+    """
+    results = []
+    pypdf_reader = None
+
+    try:
+        plumber_pdf = pdfplumber.open(path)
+    except Exception as e:
+        print(f"Erreur avec pdfplumber: {e}")
+        plumber_pdf = None
+
+    try:
+        for page_number in range(start, end):
+            # Méthode 1: pdfplumber (meilleure qualité)
+            page_text, method = "", "pdfplumber"
+            if plumber_pdf is not None:
+                try:
+                    page_text = plumber_pdf.pages[page_number].extract_text() or ""
+                except Exception as e:
+                    print(f"Erreur avec pdfplumber (page {page_number + 1}): {e}")
+
+            # Méthode 2: Fallback avec PyPDF2 pour cette page uniquement
+            if not page_text.strip():
+                try:
+                    if pypdf_reader is None:
+                        pypdf_reader = PyPDF2.PdfReader(path)
+                    page_text, method = pypdf_reader.pages[page_number].extract_text() or "", "PyPDF2"
+                except Exception as e:
+                    print(f"Erreur avec PyPDF2 (page {page_number + 1}): {e}")
+
+            results.append((page_number, page_text.strip(), method))
+    finally:
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+
+    return results
+
+
+async def count_pdf_pages(path: str) -> int:
+    """
+    Compte les pages du PDF dans le pool de processus, avant toute extraction.
+    Un fichier illisible (corrompu ou qui n'est pas un PDF) est rejeté.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_process_pool(), _count_pages, path)
+    except PyPDF2.errors.PyPdfError as e:
+        print(f"PDF illisible: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail="Impossible de lire ce PDF. Le fichier pourrait être corrompu ou protégé."
+        )
+
+
+def _submit_page_tasks(path: str, page_count: int) -> List[asyncio.Future]:
+    """Découpe le document en tâches de PDF_PAGES_PER_TASK pages soumises au pool"""
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    return [
+        loop.run_in_executor(pool, _extract_pages, path, start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ]
+
+
+def _extraction_method(methods: set) -> str:
+    return "+".join(sorted(methods, key=lambda method: method != "pdfplumber")) if methods else "pdfplumber"
+
 
 async def extract_pdf_text(file: UploadFile) -> dict:
     """Extrait le texte d'un fichier PDF"""
+    path = None
     try:
-        # Lire le contenu du fichier
-        content = await file.read()
-        
-        # Méthode 1: Essayer avec pdfplumber (meilleure qualité)
-        try:
-            with BytesIO(content) as pdf_buffer:
-                with pdfplumber.open(pdf_buffer) as pdf:
-                    text = ""
-                    page_count = len(pdf.pages)
-                    
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    
-                    if text.strip():
-                        return {
-                            "text": text.strip(),
-                            "filename": file.filename,
-                            "pages": page_count,
-                            "method": "pdfplumber"
-                        }
-        except Exception as e:
-            print(f"Erreur avec pdfplumber: {e}")
-        
-        # Méthode 2: Fallback avec PyPDF2
-        try:
-            with BytesIO(content) as pdf_buffer:
-                pdf_reader = PyPDF2.PdfReader(pdf_buffer)
-                text = ""
-                page_count = len(pdf_reader.pages)
-                
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                
-                if text.strip():
-                    return {
-                        "text": text.strip(),
-                        "filename": file.filename,
-                        "pages": page_count,
-                        "method": "PyPDF2"
-                    }
-        except Exception as e:
-            print(f"Erreur avec PyPDF2: {e}")
-        
+        # Copier le fichier sur disque : les processus d'extraction l'ouvrent par son chemin
+        path = await spool_upload(file)
+
+        page_count = await count_pdf_pages(path)
+        tasks = _submit_page_tasks(path, page_count)
+
+        pages = [page for task_result in await asyncio.gather(*tasks) for page in task_result]
+        texts = [text for _, text, _ in pages if text]
+        methods = {method for _, text, method in pages if text}
+
+        if texts:
+            return {
+                "text": "\n".join(texts),
+                "filename": file.filename,
+                "pages": page_count,
+                "method": _extraction_method(methods)
+            }
+
         # Si aucune méthode n'a fonctionné
         raise HTTPException(
-            status_code=400, 
+            status_code=400,
             detail="Impossible d'extraire le texte de ce PDF. Le fichier pourrait être corrompu ou protégé."
         )
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Erreur générale lors de l'extraction PDF: {e}")
         raise HTTPException(
-            status_code=500, 
+            status_code=500,
             detail=f"Erreur lors du traitement du PDF: {str(e)}"
-        )
\ No newline at end of file
+        )
+    finally:
+        if path is not None:
+            os.remove(path)
+
+
+async def stream_pdf_text(path: str, filename: str, page_count: int) -> AsyncGenerator[str, None]:
+    """
+    Extrait le texte d'un PDF déjà copié sur disque (voir spool_upload) et dont les pages ont
+    été comptées (voir count_pdf_pages, qui rejette les fichiers illisibles), et émet chaque page
+    au format NDJSON dès qu'elle est prête. La dernière ligne résume l'extraction ({"done": true, ...}).
+    Le fichier temporaire n'est pas supprimé ici : le générateur peut ne jamais démarrer (client
+    déconnecté), l'appelant le supprime après la réponse (voir remove_spooled_file).
+    """
+    try:
+        tasks = _submit_page_tasks(path, page_count)
+        methods = set()
+
+        for task in asyncio.as_completed(tasks):
+            for page_number, text, method in await task:
+                if text:
+                    methods.add(method)
+                yield json.dumps({"page": page_number + 1, "text": text, "method": method}, ensure_ascii=False) + "\n"
+
+        yield json.dumps({
+            "done": True,
+            "filename": filename,
+            "pages": page_count,
+            "method": _extraction_method(methods)
+        }, ensure_ascii=False) + "\n"
+
+    except Exception as e:
+        print(f"Erreur générale lors de l'extraction PDF: {e}")
+        yield json.dumps({"error": f"Erreur lors du traitement du PDF: {str(e)}"}, ensure_ascii=False) + "\n"
@@ -0,0 +1,86 @@
+import os
+import threading
+from typing import Optional
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+
+# Configuration
+QDRANT_URL = os.getenv("QDRANT_URL", "")  # Serveur Qdrant (ex: http://localhost:6333), vide = base locale
+QDRANT_PATH = os.getenv("QDRANT_PATH", "./qdrant_db")  # Base locale (développement, un seul processus)
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY") or None
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() in ("1", "true", "yes")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "30"))  # Secondes
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "16"))  # Connexions HTTP simultanées par client
+
+_client: Optional[QdrantClient] = None
+_async_client: Optional[AsyncQdrantClient] = None
+_lock = threading.Lock()
+
+
+def is_server_mode() -> bool:
+    """Vrai si la base est un serveur Qdrant partagé (plusieurs processus possibles)"""
+    return bool(QDRANT_URL)
+
+
+def describe_backend() -> str:
+    return f"serveur {QDRANT_URL}" if is_server_mode() else f"base locale {QDRANT_PATH}"
+
+
+def _server_options() -> dict:
+    return {
+        "url": QDRANT_URL,
+        "api_key": QDRANT_API_KEY,
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "timeout": QDRANT_TIMEOUT,
+        "pool_size": QDRANT_POOL_SIZE,
+    }
+
+
+def get_qdrant_client() -> QdrantClient:
+    """
+    Client Qdrant partagé du processus : connexion au serveur (pool de connexions HTTP,
+    canal gRPC multiplexé) ou base locale. La base locale ne peut être ouverte que par
+    un seul processus : utiliser QDRANT_URL pour lancer plusieurs workers.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            if is_server_mode():
+                _client = QdrantClient(**_server_options())
+            else:
+                _client = QdrantClient(path=QDRANT_PATH)
+        return _client
+
+
+def get_async_qdrant_client() -> Optional[AsyncQdrantClient]:
+    """
+    Client Qdrant asynchrone partagé du processus, en mode serveur uniquement
+    (la base locale est déjà ouverte par le client synchrone).
+    """
+    global _async_client
+    if not is_server_mode():
+        return None
+    with _lock:
+        if _async_client is None:
+            _async_client = AsyncQdrantClient(**_server_options())
+        return _async_client
+
+
+def close_clients():
+    """Ferme les clients du processus (libère le verrou de la base locale)"""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+        # Le client asynchrone se ferme dans la boucle d'événements (voir aclose_async_client)
+
+
+async def aclose_async_client():
+    """Ferme le client asynchrone (à appeler à l'arrêt de l'application)"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
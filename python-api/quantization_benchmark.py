@@ -0,0 +1,223 @@
+import time
+import argparse
+from typing import Dict, List, Tuple
+import numpy as np
+from qdrant_client import QdrantClient, models
+from collection_config import CollectionOptions, build_search_params
+from qdrant_backend import get_qdrant_client, is_server_mode
+
+
+# Configuration
+BENCHMARK_COLLECTION_PREFIX = "benchmark-"  # Collections temporaires, supprimées à la fin
+DEFAULT_SOURCE_COLLECTION = "code-civil-2"
+QUERY_NOISE = 0.05  # Bruit ajouté aux vecteurs tirés du corpus pour servir de requêtes
+
+
+def load_vectors(client: QdrantClient, collection_name: str, limit: int) -> np.ndarray:
+    """Lit les vecteurs denses d'une collection existante (corpus réel)"""
+    vectors = []
+    offset = None
+    while len(vectors) < limit:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=min(1000, limit - len(vectors)),
+            offset=offset,
+            with_payload=False,
+            with_vectors=["dense"]
+        )
+        vectors.extend(point.vector["dense"] for point in points)
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_vectors(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Vecteurs normalisés regroupés en clusters, plus proches d'embeddings réels qu'un bruit uniforme"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(count // 50, 1), dimension))
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.5 * rng.normal(size=(count, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    """Requêtes proches de vecteurs du corpus, sans en être des copies exactes"""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    queries = queries + QUERY_NOISE * rng.normal(size=queries.shape)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def vector_ram_mb(count: int, dimension: int, options: CollectionOptions) -> float:
+    """Estimation de la mémoire occupée par les vecteurs denses (hors graphe HNSW)"""
+    quantized_bytes = {"none": 0, "scalar": dimension, "binary": dimension / 8}[options.quantization]
+    original_bytes = 0 if options.on_disk else dimension * 4
+    return count * (quantized_bytes + original_bytes) / (1024 * 1024)
+
+
+def build_collection(client: QdrantClient, collection_name: str, vectors: np.ndarray, options: CollectionOptions):
+    """Crée une collection temporaire avec les options données et attend la fin de l'indexation HNSW"""
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={"dense": options.dense_vector_params(vectors.shape[1])},
+        # Construire le graphe HNSW même pour un petit corpus
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1)
+    )
+    client.upload_collection(
+        collection_name=collection_name,
+        vectors={"dense": vectors},
+        ids=list(range(len(vectors))),
+        batch_size=256,
+        wait=True
+    )
+    while client.get_collection(collection_name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.2)
+
+
+def run_queries(
+    client: QdrantClient,
+    collection_name: str,
+    queries: np.ndarray,
+    k: int,
+    search_params: models.SearchParams
+) -> Tuple[List[List[int]], List[float]]:
+    """
+    :return: (identifiants des k résultats de chaque requête, latences en ms)
+    """
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        points = client.query_points(
+            collection_name=collection_name,
+            query=query.tolist(),
+            using="dense",
+            limit=k,
+            search_params=search_params,
+            with_payload=False
+        ).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([point.id for point in points])
+    return results, latencies
+
+
+def recall_at_k(results: List[List[int]], ground_truth: List[List[int]]) -> float:
+    """Part des k plus proches voisins exacts retrouvés"""
+    found = sum(len(set(result) & set(expected)) for result, expected in zip(results, ground_truth))
+    return found / max(sum(len(expected) for expected in ground_truth), 1)
+
+
+def benchmark(
+    client: QdrantClient,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    on_disk: bool = False,
+    hnsw_m: int = 16,
+    hnsw_ef_construct: int = 100,
+    hnsw_efs: Tuple[int, ...] = (64, 128),
+    oversampling: float = 2.0
+) -> List[Dict]:
+    """
+    Compare, pour chaque mode de quantization (avec et sans rescoring) et chaque ef de recherche,
+    le rappel@k par rapport à une recherche exacte sur les vecteurs float32 et la latence.
+    """
+    rows = []
+    collection_names = []
+    try:
+        ground_truth = None
+        for quantization in ("none", "scalar", "binary"):
+            options = CollectionOptions(quantization=quantization, on_disk=on_disk,
+                                        hnsw_m=hnsw_m, hnsw_ef_construct=hnsw_ef_construct)
+            collection_name = f"{BENCHMARK_COLLECTION_PREFIX}{quantization}"
+            collection_names.append(collection_name)
+            print(f"🔧 Construction de '{collection_name}' ({options})...")
+            build_collection(client, collection_name, vectors, options)
+
+            if ground_truth is None:
+                # Référence : recherche exacte (sans HNSW ni quantization) sur les vecteurs originaux
+                ground_truth, exact_latencies = run_queries(
+                    client, collection_name, queries, k, build_search_params(exact=True, rescore=False)
+                )
+                rows.append({"config": "exacte", "ram_mb": vector_ram_mb(len(vectors), vectors.shape[1], options),
+                             "recall": 1.0, "p50_ms": np.percentile(exact_latencies, 50),
+                             "p95_ms": np.percentile(exact_latencies, 95)})
+
+            rescore_modes = (False,) if quantization == "none" else (False, True)
+            for rescore in rescore_modes:
+                for hnsw_ef in hnsw_efs:
+                    search_params = build_search_params(
+                        hnsw_ef=hnsw_ef, rescore=rescore, oversampling=oversampling if rescore else 1.0
+                    )
+                    results, latencies = run_queries(client, collection_name, queries, k, search_params)
+                    label = quantization if quantization == "none" else f"{quantization}{' +rescore' if rescore else ''}"
+                    rows.append({
+                        "config": f"{label} ef={hnsw_ef}",
+                        "ram_mb": vector_ram_mb(len(vectors), vectors.shape[1], options),
+                        "recall": recall_at_k(results, ground_truth),
+                        "p50_ms": np.percentile(latencies, 50),
+                        "p95_ms": np.percentile(latencies, 95)
+                    })
+    finally:
+        for collection_name in collection_names:
+            client.delete_collection(collection_name)
+
+    print(f"\n{len(vectors)} vecteurs de dimension {vectors.shape[1]}, {len(queries)} requêtes, k={k}, "
+          f"m={hnsw_m}, ef_construct={hnsw_ef_construct}, vecteurs sur disque: {on_disk}")
+    print(f"{'Configuration':<26} | {'RAM vecteurs (Mo)':>17} | {f'Rappel@{k}':>9} | {'p50 (ms)':>8} | {'p95 (ms)':>8}")
+    for row in rows:
+        print(f"{row['config']:<26} | {row['ram_mb']:>17.1f} | {row['recall']:>9.3f} | "
+              f"{row['p50_ms']:>8.2f} | {row['p95_ms']:>8.2f}")
+    return rows
+
+
+def main():
+    """Compare le rappel et la latence des options de stockage des collections"""
+    parser = argparse.ArgumentParser(description="Rappel et latence selon la quantization et les paramètres HNSW")
+    parser.add_argument("--url", default=None,
+                        help="Serveur Qdrant (par défaut : QDRANT_URL, ou la base locale QDRANT_PATH)")
+    parser.add_argument("--collection", default=DEFAULT_SOURCE_COLLECTION,
+                        help="Collection dont les vecteurs servent de corpus")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Utilise N vecteurs synthétiques au lieu de la collection")
+    parser.add_argument("--dimension", type=int, default=1024, help="Dimension des vecteurs synthétiques")
+    parser.add_argument("--limit", type=int, default=20000, help="Nombre maximum de vecteurs lus dans la collection")
+    parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes")
+    parser.add_argument("--k", type=int, default=10, help="Nombre de résultats par requête")
+    parser.add_argument("--on-disk", action="store_true", help="Vecteurs originaux sur disque")
+    parser.add_argument("--hnsw-m", type=int, default=16, help="Paramètre m du graphe HNSW")
+    parser.add_argument("--hnsw-ef-construct", type=int, default=100, help="Paramètre ef_construct du graphe HNSW")
+    parser.add_argument("--hnsw-ef", type=int, nargs="+", default=[64, 128], help="Valeurs de ef à la recherche")
+    parser.add_argument("--oversampling", type=float, default=2.0, help="Sur-échantillonnage avant rescoring")
+    args = parser.parse_args()
+
+    if args.url:
+        client = QdrantClient(url=args.url)
+    else:
+        if not is_server_mode():
+            print("⚠️ Base locale : Qdrant local fait une recherche exacte et ignore quantization et HNSW, "
+                  "utiliser --url ou QDRANT_URL pour des mesures représentatives")
+        client = get_qdrant_client()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dimension)
+    else:
+        vectors = load_vectors(client, args.collection, args.limit)
+        if len(vectors) == 0:
+            raise SystemExit(f"Aucun vecteur dans la collection '{args.collection}' (utiliser --synthetic N)")
+
+    benchmark(
+        client,
+        vectors,
+        make_queries(vectors, args.queries),
+        k=args.k,
+        on_disk=args.on_disk,
+        hnsw_m=args.hnsw_m,
+        hnsw_ef_construct=args.hnsw_ef_construct,
+        hnsw_efs=tuple(args.hnsw_ef),
+        oversampling=args.oversampling
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import re
+from typing import List, Optional
+from qdrant_client import QdrantClient, models
+from ArticleStore import normalize_article_number
+from dict import find_numbers_in_string, numbers_dict
+
+
+# Champs du payload filtrables, indexés comme mots-clés dans Qdrant
+LIVRE_FIELD = "metadata.livre_numero"
+TITRE_FIELD = "metadata.titre_numero"
+ARTICLES_FIELD = "metadata.all_articles"
+FILTER_PAYLOAD_FIELDS = (LIVRE_FIELD, TITRE_FIELD, ARTICLES_FIELD)
+
+# Mention d'une division dans une question (ex: "livre Ier", "titre IV bis", "livre premier")
+DIVISION_MENTION_PATTERN = re.compile(r"\b(livre|titre)\s+(\w+(?:\s+(?:bis|ter|quater)\b)?)", re.IGNORECASE)
+
+# Mention d'un ou plusieurs articles (fautes de frappe courantes comprises), suivie des numéros cités
+ARTICLE_MENTION_PATTERN = re.compile(
+    r"\b(?:articles?|art|articl|artcile|artical|artilce|aticle|ariticle)\b\.?", re.IGNORECASE
+)
+# Numéro en chiffres (éventuellement composé : "16-11"), mot ou ponctuation
+ARTICLE_LIST_TOKEN_PATTERN = re.compile(r"\d+(?:-\d+)*|[^\W\d_]+|\S")
+# Mots des nombres en lettres ("vingt", "et", "cent"...) et séparateurs d'une liste d'articles
+NUMBER_WORDS = {token for words in numbers_dict for token in re.findall(r"\w+", words)} | {"vingts", "cents"}
+ARTICLE_LIST_SEPARATORS = {",", "-", "et", "ou", "à", "au", "n", "°", "no", "numéro", "numéros"}
+
+ROMAN_NUMERAL_PATTERN = re.compile(r"^[ivxlcdm]+$")
+ROMAN_VALUES = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
+FIRST_DIVISION_WORDS = {"ier", "1er", "premier", "première", "premiere"}
+ORDINAL_EXCEPTIONS = {"cinqu": "cinq", "neuv": "neuf"}  # "cinquième", "neuvième"
+
+
+def _roman_to_int(roman: str) -> int:
+    total = 0
+    for current, following in zip(roman, roman[1:] + " "):
+        value = ROMAN_VALUES[current]
+        total += -value if ROMAN_VALUES.get(following, 0) > value else value
+    return total
+
+
+def normalize_division_number(value: str) -> Optional[str]:
+    """
+    Normalise le numéro d'un livre ou d'un titre pour servir de clé de filtre.
+    Ex: "Ier" -> "1", "IV bis" -> "4bis", "premier" -> "1", "troisième" -> "3", "préliminaire" -> "préliminaire"
+
+    :return: Numéro normalisé, ou None si la valeur n'est pas un numéro
+    """
+    match = re.match(r"^(\S+)(?:\s+(bis|ter|quater))?$", value.strip().lower())
+    if not match:
+        return None
+    number, suffix = match.group(1), match.group(2) or ""
+
+    if number in ("préliminaire", "preliminaire"):
+        return "préliminaire"
+    if number in FIRST_DIVISION_WORDS:
+        normalized = 1
+    elif number.isdigit():
+        normalized = int(number)
+    elif ROMAN_NUMERAL_PATTERN.match(number):
+        normalized = _roman_to_int(number)
+    elif number in numbers_dict:
+        normalized = numbers_dict[number]
+    elif number.endswith("ième"):
+        stem = ORDINAL_EXCEPTIONS.get(number[:-4], number[:-4])
+        normalized = numbers_dict.get(stem) or numbers_dict.get(stem + "e")
+        if normalized is None:
+            return None
+    else:
+        return None
+
+    return f"{normalized}{suffix}"
+
+
+def heading_division_number(heading: str) -> str:
+    """
+    Numéro normalisé d'un titre de structure lu dans le code.
+    Ex: "Ier : Des personnes" -> "1", ": XIV : Des mesures..." -> "14"
+    """
+    match = re.match(r"[:\s]*([^:]+)", heading)
+    return (normalize_division_number(match.group(1)) or "") if match else ""
+
+
+class QueryFilters:
+    """Filtres structurés extraits d'une question : livre, titre et numéros d'articles cités"""
+
+    def __init__(self, livre: Optional[str] = None, titre: Optional[str] = None, articles: Optional[List[str]] = None):
+        self.livre = livre
+        self.titre = titre
+        self.articles = articles or []
+
+    def is_empty(self) -> bool:
+        return not (self.livre or self.titre or self.articles)
+
+    def cache_key(self) -> str:
+        """Représentation stable des filtres, pour les clés de cache"""
+        return f"livre={self.livre or ''};titre={self.titre or ''};articles={','.join(self.articles)}"
+
+    def to_qdrant_filter(self) -> Optional[models.Filter]:
+        """Filtre Qdrant correspondant (None si aucun filtre)"""
+        conditions = []
+        if self.livre:
+            conditions.append(models.FieldCondition(key=LIVRE_FIELD, match=models.MatchValue(value=self.livre)))
+        if self.titre:
+            conditions.append(models.FieldCondition(key=TITRE_FIELD, match=models.MatchValue(value=self.titre)))
+        if self.articles:
+            conditions.append(models.FieldCondition(key=ARTICLES_FIELD, match=models.MatchAny(any=self.articles)))
+        return models.Filter(must=conditions) if conditions else None
+
+    def __repr__(self) -> str:
+        return f"QueryFilters({self.cache_key()})"
+
+
+def cited_article_numbers(text: str) -> List[str]:
+    """
+    Numéros des articles cités : seuls les nombres qui suivent une mention "article(s)" / "art."
+    sont retenus, y compris les listes ("articles 16-11 et 16-12", "art. 1240, 1241 ou 1242")
+    et les nombres en lettres ("article mille deux cent quarante").
+    Ex: "J'ai 3 enfants, que dit l'article 229 ?" -> ["229"]
+    """
+    numbers: List[str] = []
+    for mention in ARTICLE_MENTION_PATTERN.finditer(text):
+        words: List[str] = []
+        for token in ARTICLE_LIST_TOKEN_PATTERN.findall(text[mention.end():]):
+            lowered = token.lower()
+            if token[0].isdigit():
+                numbers.append(normalize_article_number(token))
+                words.append(",")  # Sépare les nombres en lettres qui précèdent et qui suivent
+            elif lowered in NUMBER_WORDS or lowered in ARTICLE_LIST_SEPARATORS:
+                words.append(lowered)
+            else:
+                break  # Fin de la liste d'articles
+        # Nombres en lettres de la liste
+        numbers.extend(find_numbers_in_string("article " + " ".join(words)))
+    return list(dict.fromkeys(numbers))
+
+
+def extract_query_filters(query: str) -> QueryFilters:
+    """
+    Extrait d'une question les filtres de recherche : "livre ...", "titre ..." et les numéros
+    des articles cités (voir cited_article_numbers). Les autres nombres de la question ne filtrent pas.
+    """
+    filters = QueryFilters()
+    remaining = query
+
+    # Divisions citées : les numéros correspondants ne sont pas des numéros d'articles
+    for match in DIVISION_MENTION_PATTERN.finditer(query):
+        number = normalize_division_number(match.group(2))
+        if number is None:
+            continue  # "à titre gratuit", "au titre de"...
+        if match.group(1).lower() == "livre":
+            filters.livre = filters.livre or number
+        else:
+            filters.titre = filters.titre or number
+        remaining = remaining.replace(match.group(0), " ")
+
+    filters.articles = cited_article_numbers(remaining)
+    return filters
+
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str):
+    """Crée (si besoin) les index mots-clés sur les champs filtrables de la collection"""
+    for field_name in FILTER_PAYLOAD_FIELDS:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=models.PayloadSchemaType.KEYWORD
+        )
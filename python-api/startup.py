@@ -0,0 +1,142 @@
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+
+# Configuration
+READY_POLL_INTERVAL = 0.1  # Secondes entre deux vérifications d'un composant attendu
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ComponentNotReady(Exception):
+    """Composant en échec ou pas encore chargé à l'expiration du délai d'attente"""
+
+
+class StartupComponent:
+    """Composant chargé au démarrage : fonction de chargement, dépendances, état et durée"""
+
+    def __init__(self, name: str, loader: Callable[[], object], depends_on: Iterable[str] = ()):
+        self.name = name
+        self.loader = loader
+        self.depends_on = tuple(depends_on)
+        self.status = PENDING
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+    def report(self, origin: Optional[float]) -> Dict:
+        """État du composant, avec ses instants relatifs au démarrage (secondes)"""
+        def relative(instant: Optional[float]) -> Optional[float]:
+            return round(instant - origin, 3) if instant is not None and origin is not None else None
+
+        duration = None
+        if self.started_at is not None:
+            duration = round((self.finished_at or time.perf_counter()) - self.started_at, 3)
+        return {
+            "status": self.status,
+            "depends_on": list(self.depends_on),
+            "started_at": relative(self.started_at),
+            "finished_at": relative(self.finished_at),
+            "duration": duration,
+            "error": self.error,
+        }
+
+
+class StartupOrchestrator:
+    """
+    Charge les composants de l'application en arrière-plan, chacun dans son thread :
+    les composants indépendants (modèles, connexion Qdrant, LLM) se chargent simultanément,
+    un composant attend la fin de ses dépendances. L'API répond pendant le chargement,
+    les endpoints attendent seulement les composants dont ils ont besoin.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, StartupComponent] = {}
+        self._started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], object], depends_on: Iterable[str] = ()):
+        """
+        Déclare un composant (avant start).
+
+        :param name: Nom du composant, tel qu'affiché par /ready
+        :param loader: Fonction de chargement, exécutée dans un thread
+        :param depends_on: Composants à charger avant celui-ci
+        """
+        for dependency in depends_on:
+            if dependency not in self._components:
+                raise ValueError(f"Dépendance inconnue pour {name}: {dependency}")
+        self._components[name] = StartupComponent(name, loader, depends_on)
+
+    def start(self):
+        """Lance le chargement de tous les composants (sans effet s'il est déjà lancé)"""
+        with self._lock:
+            if self._started_at is not None:
+                return
+            self._started_at = time.perf_counter()
+        print(f"🚀 Chargement en arrière-plan: {', '.join(self._components)}")
+        for component in self._components.values():
+            threading.Thread(
+                target=self._load, args=(component,), name=f"startup-{component.name}", daemon=True
+            ).start()
+
+    def _load(self, component: StartupComponent):
+        for dependency in component.depends_on:
+            self._components[dependency].done.wait()
+        failed = [name for name in component.depends_on if self._components[name].status != READY]
+        if failed:
+            component.status = FAILED
+            component.error = f"Dépendance indisponible: {', '.join(failed)}"
+            component.done.set()
+            return
+
+        component.status = LOADING
+        component.started_at = time.perf_counter()
+        try:
+            component.loader()
+            component.status = READY
+        except Exception as e:
+            component.status = FAILED
+            component.error = str(e)
+            print(f"❌ Chargement de {component.name} impossible: {e}")
+        component.finished_at = time.perf_counter()
+        if component.status == READY:
+            print(f"✅ {component.name} prêt en {component.finished_at - component.started_at:.1f}s")
+        component.done.set()
+
+    def is_ready(self, *names: str) -> bool:
+        """Vrai si les composants donnés (tous par défaut) sont chargés"""
+        return all(self._components[name].status == READY for name in names or self._components)
+
+    def _check(self, names: Iterable[str]) -> bool:
+        """Vrai si tous les composants sont prêts, lève ComponentNotReady si l'un a échoué"""
+        for name in names:
+            component = self._components[name]
+            if component.status == FAILED:
+                raise ComponentNotReady(f"{name} indisponible: {component.error}")
+        return all(self._components[name].status == READY for name in names)
+
+    async def wait_ready(self, *names: str, timeout: Optional[float] = None):
+        """Attend, sans bloquer la boucle asyncio, que les composants donnés (tous par défaut) soient chargés"""
+        names = names or tuple(self._components)
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._check(names):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise ComponentNotReady(f"{', '.join(names)} toujours en cours de chargement après {timeout}s")
+            await asyncio.sleep(READY_POLL_INTERVAL)
+
+    def report(self) -> Dict:
+        """État de chaque composant et durée écoulée depuis le début du chargement"""
+        elapsed = None if self._started_at is None else round(time.perf_counter() - self._started_at, 3)
+        return {
+            "ready": self.is_ready(),
+            "elapsed": elapsed,
+            "components": {name: component.report(self._started_at) for name, component in self._components.items()},
+        }
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Les modules de l'API sont importés depuis python-api/, comme au lancement du serveur
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from indexer import CodeCivilIndexer
+from query_filters import extract_query_filters
+
+
+CODE_CIVIL_PATH = Path(__file__).resolve().parent.parent / "documents" / "code-civil.txt"
+
+
+@pytest.fixture(scope="module")
+def chunks():
+    """Chunks du Code civil, découpés sans modèle d'embedding ni client Qdrant"""
+    indexer = CodeCivilIndexer.__new__(CodeCivilIndexer)
+    indexer.chunk_size_words = 520
+    indexer.chunk_overlap_words = 50
+    indexer.code_civil_path = CODE_CIVIL_PATH
+    return list(indexer._iter_chunks(indexer._load_and_preprocess_text()))
+
+
+def test_first_chunk_belongs_to_titre_preliminaire(chunks):
+    assert chunks[0].metadata["titre_numero"] == "préliminaire"
+
+
+def test_chunk_starting_with_headings_takes_their_titre(chunks):
+    divorce = next(doc for doc in chunks if "Titre VI : Du divorce" in doc.page_content.split("Article", 1)[0])
+    assert divorce.metadata["titre_numero"] == "6"
+    assert divorce.metadata["titre_titre"] == "Du divorce"
+
+
+def test_division_numbers_match_query_filters(chunks):
+    divorce = next(doc for doc in chunks if "229" in doc.metadata["all_articles"])
+    filters = extract_query_filters("Dans le livre Ier, titre VI, que prévoit le divorce ?")
+    assert (divorce.metadata["livre_numero"], divorce.metadata["titre_numero"]) == (filters.livre, filters.titre)
@@ -1,7 +1,10 @@
-import os
-import re
 from typing import List, Dict
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from ArticleStore import ArticleStore, CODE_CIVIL_PATH
+
+# Index des articles construit une seule fois au démarrage
+article_store = ArticleStore(CODE_CIVIL_PATH)
+
 
 def convert_prompt_to_langchain_messages(messages: List[Dict[str, str]]) -> List:
     # Convertir les messages au format LangChain
@@ -21,6 +24,12 @@ def convert_prompt_to_langchain_messages(messages: List[Dict[str, str]]) -> List
     return langchain_messages
 
 
+def _format_article(article_number: str, article_text) -> str:
+    if article_text is None:
+        return f"Article {article_number} non trouvé dans le code civil."
+    return article_text
+
+
 def get_specific_civil_code_article(article_number: str) -> str:
     """
     Récupère un article spécifique du code civil français à partir de son numéro.
@@ -31,28 +40,31 @@ def get_specific_civil_code_article(article_number: str) -> str:
     print(f"🔍 Recherche de l'article {article_number} dans le code civil...")
     
     try:
-        # Chemin vers le fichier du code civil
-        file_path = "./documents/code-civil.txt"
-        
         # Vérifier si le fichier existe
-        if not os.path.exists(file_path):
-            return f"Erreur: Le fichier {file_path} n'existe pas."
+        if not article_store.exists():
+            return f"Erreur: Le fichier {CODE_CIVIL_PATH} n'existe pas."
         
-        # Lire le contenu du fichier
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Pattern pour trouver l'article spécifique
-        pattern = rf"Article {re.escape(article_number)}\b.*?(?=Article \d+|$)"
-        
-        # Rechercher l'article
-        match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-        
-        if match:
-            article_text = match.group(0).strip()
-            return article_text
-        else:
-            return f"Article {article_number} non trouvé dans le code civil."
+        return _format_article(article_number, article_store.get_article(article_number))
             
     except Exception as e:
-        return f"Erreur lors de la lecture du code civil: {str(e)}"
\ No newline at end of file
+        return f"Erreur lors de la lecture du code civil: {str(e)}"
+
+
+def get_specific_civil_code_articles(article_numbers: List[str]) -> List[str]:
+    """
+    Récupère plusieurs articles du code civil français en une seule recherche.
+        param article_numbers: Les numéros des articles à récupérer
+        return: Le texte de chaque article, dans l'ordre demandé
+    """
+
+    print(f"🔍 Recherche des articles {', '.join(article_numbers)} dans le code civil...")
+
+    try:
+        if not article_store.exists():
+            return [f"Erreur: Le fichier {CODE_CIVIL_PATH} n'existe pas."]
+
+        articles = article_store.get_articles(article_numbers)
+        return [_format_article(number, articles[number]) for number in article_numbers]
+
+    except Exception as e:
+        return [f"Erreur lors de la lecture du code civil: {str(e)}"]